@@ -0,0 +1,461 @@
+"""
+API local de ingestão do Vledger.
+
+Serviço HTTP (asyncio, apenas biblioteca padrão) que roda ao lado do Streamlit e
+permite que ERPs e rotinas de sincronização bancária enviem lançamentos sem
+passar pela tela de upload. Os lançamentos são classificados com o mesmo motor
+da página de Classificação (`classificador.classificar`) e gravados em
+`classificacoes` por um gravador que agrupa várias requisições em um único
+commit.
+
+Endpoints:
+    GET  /saude
+    POST /empresas/<empresa_id>/lancamentos
+         {"lancamentos": [{"descricao": "...", "valor": "1.234,56", "data": "01/02/2024"}],
+          "salvar": true, "sugerir": false}
+         Lançamentos sem descrição, com valor não numérico ou data inválida
+         fazem a requisição inteira ser recusada com 400 (campo "invalidos").
+
+Uso:
+    python api.py [--host 127.0.0.1] [--porta 8600]
+"""
+import argparse
+import asyncio
+import json
+import math
+import re
+import time
+from datetime import datetime
+
+import banco
+from leitura import FORMATOS_DATA
+
+TAMANHO_LOTE = 5000          # linhas por commit
+INTERVALO_LOTE = 0.002       # segundos esperando mais requisições antes do commit
+CAPACIDADE_FILA = 200        # requisições aguardando gravação (backpressure)
+TIMEOUT_FILA = 5.0           # segundos esperando vaga na fila antes de responder 503
+TTL_REFERENCIAS = 5.0        # segundos de cache do plano de referências por empresa
+MAX_CORPO = 20 * 1024 * 1024
+MAX_LANCAMENTOS = 50000
+LIMIAR_VETORIZADO = 500      # a partir daqui a classificação usa pandas
+MAX_CENTAVOS = 2 ** 63 - 1    # limites do INTEGER do SQLite
+MIN_CENTAVOS = -(2 ** 63)
+
+_ROTA_LANCAMENTOS = re.compile(r"^/empresas/(\d+)/lancamentos/?$")
+_RE_NUMERO = re.compile(r"^[-+]?(\d[\d.,]*|[.,]\d+)$")
+_STATUS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem, detalhes=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+        self.detalhes = detalhes
+
+
+# ==========================================================
+# GRAVAÇÃO EM LOTE
+# ==========================================================
+class GravadorEmLote:
+    """
+    Agrupa as linhas de várias requisições e grava tudo em um único commit.
+    Cada requisição recebe um future resolvido quando o seu lote é gravado. A
+    fila tem capacidade limitada: quando o banco não acompanha, as requisições
+    esperam por vaga e, depois de `TIMEOUT_FILA`, recebem 503.
+    """
+
+    def __init__(self, tamanho_lote=TAMANHO_LOTE, intervalo=INTERVALO_LOTE, capacidade=CAPACIDADE_FILA):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.fila = asyncio.Queue(maxsize=capacidade)
+        self.commits = 0
+        self.linhas_gravadas = 0
+        self._tarefa = None
+
+    def iniciar(self):
+        self._tarefa = asyncio.create_task(self._executar())
+
+    async def encerrar(self):
+        await self.fila.join()
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+
+    async def enviar(self, linhas):
+        """Enfileira as linhas e aguarda o commit do lote que as contém."""
+        futuro = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self.fila.put((linhas, futuro)), TIMEOUT_FILA)
+        except asyncio.TimeoutError:
+            raise ErroHTTP(503, "Fila de gravação cheia, tente novamente")
+        await futuro
+
+    async def _executar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            itens = [await self.fila.get()]
+            total = len(itens[0][0])
+            # tudo que chegou enquanto o commit anterior rodava entra neste lote
+            while total < self.tamanho_lote and not self.fila.empty():
+                item = self.fila.get_nowait()
+                itens.append(item)
+                total += len(item[0])
+            limite = loop.time() + self.intervalo
+            while total < self.tamanho_lote:
+                restante = limite - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                itens.append(item)
+                total += len(item[0])
+
+            try:
+                await self._gravar(itens)
+            finally:
+                for _ in itens:
+                    self.fila.task_done()
+
+    async def _gravar(self, itens):
+        """
+        Grava as linhas de `itens` em um commit e resolve o future de cada um.
+        Se o commit conjunto falhar, cada requisição é regravada sozinha: os
+        dados de um cliente não derrubam a gravação dos demais.
+        """
+        lote = [linha for linhas, _ in itens for linha in linhas]
+        try:
+            # a existência da empresa é conferida de novo dentro da transação de gravação
+            ausentes = await asyncio.to_thread(banco.inserir_classificacoes, lote)
+        except Exception as e:
+            if len(itens) > 1:
+                for item in itens:
+                    await self._gravar([item])
+                return
+            for _, futuro in itens:
+                if not futuro.done():
+                    futuro.set_exception(ErroHTTP(500, f"Erro ao gravar no banco: {e}"))
+            return
+
+        self.commits += 1
+        for linhas, futuro in itens:
+            empresa_id = linhas[0][0]
+            if empresa_id in ausentes:
+                _cache_referencias.pop(empresa_id, None)
+                erro = ErroHTTP(404, f"Empresa {empresa_id} não encontrada")
+                if not futuro.done():
+                    futuro.set_exception(erro)
+                continue
+            self.linhas_gravadas += len(linhas)
+            if not futuro.done():
+                futuro.set_result(None)
+
+
+# ==========================================================
+# CLASSIFICAÇÃO
+# ==========================================================
+_cache_referencias = {}
+
+def listar_referencias(empresa_id):
+    conn = banco.conectar()
+    existe = conn.execute("SELECT 1 FROM empresas WHERE id=?", (empresa_id,)).fetchone()
+    refs = conn.execute(
+        "SELECT nome, conta_d, conta_e FROM referencias WHERE empresa_id=? ORDER BY nome",
+        (empresa_id,)
+    ).fetchall()
+    conn.close()
+    if not existe:
+        raise ErroHTTP(404, f"Empresa {empresa_id} não encontrada")
+    return refs
+
+def referencias_em_cache(empresa_id):
+    """Plano de referências da empresa, relido do banco no máximo a cada `TTL_REFERENCIAS`."""
+    from classificador import preparar_referencias
+
+    agora = time.monotonic()
+    item = _cache_referencias.get(empresa_id)
+    if item is None or agora - item["lido_em"] > TTL_REFERENCIAS:
+        refs = listar_referencias(empresa_id)
+        item = {"lido_em": agora, "refs": refs, "preparadas": preparar_referencias(refs), "indice": None}
+        _cache_referencias[empresa_id] = item
+    return item
+
+def _referencias_validas(empresa_id):
+    """Item do cache ainda dentro do TTL, sem tocar no banco; None se precisa reler."""
+    item = _cache_referencias.get(empresa_id)
+    if item is None or time.monotonic() - item["lido_em"] > TTL_REFERENCIAS:
+        return None
+    return item
+
+def _data_iso(valor, hoje):
+    """Data em ISO; `hoje` se não informada, None se informada e inválida."""
+    if valor is None or str(valor).strip() == "":
+        return hoje
+    if not isinstance(valor, str):
+        return None
+    texto = valor.strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    import pandas as pd
+
+    data = pd.to_datetime(texto, dayfirst=True, errors="coerce")
+    return None if pd.isna(data) else data.strftime("%Y-%m-%d")
+
+def _valor_centavos(valor):
+    """
+    Valor em centavos, aceitando números JSON ou texto BR/EN ('1.234,56',
+    'R$ 10,50', '-3.2'). Retorna None se não for um número.
+    """
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return _no_intervalo(round(valor * 100)) if math.isfinite(valor) else None
+    if not isinstance(valor, str):
+        return None
+    texto = valor.replace("R$", "").replace(" ", "").strip()
+    if not _RE_NUMERO.match(texto):
+        return None
+    # mesma interpretação de `classificador.parse_number`, sem o fallback que descarta caracteres
+    if "." in texto and "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    elif "," in texto:
+        texto = texto.replace(",", ".")
+    try:
+        return _no_intervalo(round(float(texto) * 100))
+    except (ValueError, OverflowError):
+        return None
+
+def _no_intervalo(centavos):
+    """Centavos que cabem no INTEGER do SQLite (64 bits com sinal); senão None."""
+    return centavos if MIN_CENTAVOS <= centavos <= MAX_CENTAVOS else None
+
+def validar_lancamentos(lancamentos, hoje):
+    """
+    Confere cada lançamento e devolve (descricoes, valores em centavos, datas ISO).
+    Se algum for inválido, levanta ErroHTTP 400 com o índice e os campos de cada um.
+    """
+    descricoes, valores, datas, invalidos = [], [], [], []
+    for i, l in enumerate(lancamentos):
+        erros = []
+        descricao = l.get("descricao")
+        if not isinstance(descricao, str) or not descricao.strip():
+            erros.append("descricao deve ser um texto não vazio")
+        centavos = _valor_centavos(l.get("valor"))
+        if centavos is None:
+            erros.append("valor deve ser um número dentro do limite de 64 bits (em centavos)")
+        data = _data_iso(l.get("data"), hoje)
+        if data is None:
+            erros.append("data inválida")
+        if erros:
+            invalidos.append({"indice": i, "erros": erros})
+        else:
+            descricoes.append(descricao)
+            valores.append(centavos)
+            datas.append(data)
+    if invalidos:
+        raise ErroHTTP(400, f"{len(invalidos)} lançamento(s) inválido(s)", {"invalidos": invalidos})
+    return descricoes, valores, datas
+
+def classificar_lancamentos(empresa_id, lancamentos, sugerir=False, referencias=None):
+    """
+    Classifica a lista de lançamentos (dicts com descricao, valor e data).
+    Retorna (resultados por lançamento, linhas prontas para `classificacoes`).
+    `referencias` é um item de `referencias_em_cache` já lido; se omitido, é obtido aqui.
+    Lotes grandes usam o caminho vetorizado (pandas) de `classificador.classificar`;
+    lotes pequenos usam `classificar_descricao`, com a mesma regra, sem o custo fixo do pandas.
+    """
+    from classificador import classificar_descricao
+
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    data_proc = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    descricoes, valores, datas = validar_lancamentos(lancamentos, hoje)
+    item = referencias or referencias_em_cache(empresa_id)
+
+    if len(lancamentos) >= LIMIAR_VETORIZADO:
+        import pandas as pd
+        from classificador import classificar
+
+        df = pd.DataFrame({"descricao": descricoes, "valor": 0.0, "data_movimento": pd.NaT})
+        classificado, _ = classificar(df, item["refs"])
+        contas = list(zip(classificado["debito"], classificado["credito"]))
+    else:
+        contas = [classificar_descricao(d, item["preparadas"]) for d in descricoes]
+
+    resultados = [{"debito": d, "credito": c} for d, c in contas]
+    linhas = [
+        (empresa_id, descricao[:1000], d or "", c or "", centavos, data, data_proc, None)
+        for descricao, centavos, data, (d, c) in zip(descricoes, valores, datas, contas)
+    ]
+
+    if sugerir:
+        import similaridade
+
+        if item["indice"] is None:
+            item["indice"] = similaridade.construir_indice(item["refs"])
+        pendentes = [i for i, (d, c) in enumerate(contas) if not d and not c]
+        posicoes, pontuacoes = similaridade.sugerir([descricoes[i] for i in pendentes], item["indice"])
+        for r in resultados:
+            r.update(sugestao="", similaridade=0.0)
+        for i, pos, pontuacao in zip(pendentes, posicoes, pontuacoes):
+            if pos >= 0:
+                resultados[i].update(
+                    sugestao=item["indice"]["refs"][pos][0], similaridade=round(float(pontuacao), 3)
+                )
+    return resultados, linhas
+
+
+# ==========================================================
+# HTTP
+# ==========================================================
+class ServidorIngestao:
+    def __init__(self, gravador=None):
+        self.gravador = gravador or GravadorEmLote()
+
+    async def iniciar(self, host="127.0.0.1", porta=8600):
+        banco.inicializar_banco()
+        self.gravador.iniciar()
+        self.servidor = await asyncio.start_server(self._conexao, host, porta)
+        return self.servidor
+
+    async def encerrar(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        await self.gravador.encerrar()
+
+    async def _conexao(self, reader, writer):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, caminho, versao = linha.decode("latin-1").split()
+                except ValueError:
+                    await self._responder(writer, 400, {"erro": "Requisição inválida"}, manter=False)
+                    break
+
+                cabecalhos = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = h.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                try:
+                    tamanho = int(cabecalhos.get("content-length", 0) or 0)
+                except ValueError:
+                    tamanho = -1
+                if tamanho < 0:
+                    await self._responder(writer, 400, {"erro": "Content-Length inválido"}, manter=False)
+                    break
+                if tamanho > MAX_CORPO:
+                    await self._responder(writer, 413, {"erro": "Corpo da requisição muito grande"}, manter=False)
+                    break
+                corpo = await reader.readexactly(tamanho) if tamanho else b""
+
+                manter = cabecalhos.get("connection", "").lower() != "close" and versao == "HTTP/1.1"
+                try:
+                    status, resposta = await self._rotear(metodo, caminho, corpo)
+                except ErroHTTP as e:
+                    status, resposta = e.status, {"erro": e.mensagem, **(e.detalhes or {})}
+                except Exception as e:
+                    status, resposta = 500, {"erro": str(e)}
+                await self._responder(writer, status, resposta, manter)
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _responder(self, writer, status, resposta, manter):
+        corpo = json.dumps(resposta, ensure_ascii=False, default=str).encode("utf-8")
+        cabecalho = (
+            f"HTTP/1.1 {status} {_STATUS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n"
+        )
+        if status == 503:
+            cabecalho += "Retry-After: 1\r\n"
+        writer.write(cabecalho.encode("latin-1") + b"\r\n" + corpo)
+        await writer.drain()
+
+    async def _rotear(self, metodo, caminho, corpo):
+        caminho = caminho.split("?", 1)[0]
+        if caminho == "/saude":
+            return 200, {
+                "status": "ok",
+                "commits": self.gravador.commits,
+                "linhas_gravadas": self.gravador.linhas_gravadas,
+                "fila": self.gravador.fila.qsize(),
+            }
+
+        rota = _ROTA_LANCAMENTOS.match(caminho)
+        if rota is None:
+            raise ErroHTTP(404, "Rota não encontrada")
+        if metodo != "POST":
+            raise ErroHTTP(405, "Use POST")
+        return await self._lancamentos(int(rota.group(1)), corpo)
+
+    async def _lancamentos(self, empresa_id, corpo):
+        try:
+            dados = json.loads(corpo or b"{}")
+        except ValueError:
+            raise ErroHTTP(400, "JSON inválido")
+        lancamentos = dados.get("lancamentos") if isinstance(dados, dict) else None
+        if not isinstance(lancamentos, list) or not all(isinstance(l, dict) for l in lancamentos):
+            raise ErroHTTP(400, "Informe 'lancamentos' como uma lista de objetos")
+        if len(lancamentos) > MAX_LANCAMENTOS:
+            raise ErroHTTP(413, f"Máximo de {MAX_LANCAMENTOS} lançamentos por requisição")
+        if not lancamentos:
+            return 200, {"empresa_id": empresa_id, "gravados": 0, "lancamentos": []}
+
+        sugerir = bool(dados.get("sugerir", False))
+        if len(lancamentos) >= LIMIAR_VETORIZADO or sugerir:
+            # lotes grandes não bloqueiam o loop enquanto são classificados
+            resultados, linhas = await asyncio.to_thread(
+                classificar_lancamentos, empresa_id, lancamentos, sugerir
+            )
+        else:
+            # a releitura do plano espera pelo lock do banco (até 30 s se houver um
+            # escritor), então roda fora do loop; com o cache válido não há E/S
+            referencias = _referencias_validas(empresa_id)
+            if referencias is None:
+                referencias = await asyncio.to_thread(referencias_em_cache, empresa_id)
+            resultados, linhas = classificar_lancamentos(empresa_id, lancamentos, sugerir, referencias)
+
+        gravados = 0
+        if dados.get("salvar", True):
+            await self.gravador.enviar(linhas)
+            gravados = len(linhas)
+        return 200, {"empresa_id": empresa_id, "gravados": gravados, "lancamentos": resultados}
+
+
+async def principal(host, porta):
+    servidor = ServidorIngestao()
+    await servidor.iniciar(host, porta)
+    print(f"Vledger API ouvindo em http://{host}:{porta}")
+    try:
+        await servidor.servidor.serve_forever()
+    finally:
+        await servidor.encerrar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API local de ingestão do Vledger")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8600)
+    args = parser.parse_args()
+    try:
+        asyncio.run(principal(args.host, args.porta))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,354 @@
+import sqlite3
+import threading
+
+# =========================================
+# Banco de dados: conexão e estrutura das tabelas
+# =========================================
+# Todas as páginas usam `conectar()` e chamam `inicializar_banco()` ao abrir.
+# A criação/migração das tabelas roda uma única vez por processo; as
+# renderizações seguintes não tocam no esquema.
+
+CAMINHO_BANCO = "vledger.db"
+
+_lock = threading.Lock()
+_inicializado = False
+
+
+def conectar():
+    return sqlite3.connect(CAMINHO_BANCO, timeout=30)
+
+
+def _colunas(cur, tabela):
+    cur.execute(f"PRAGMA table_info({tabela})")
+    return [row[1] for row in cur.fetchall()]
+
+
+def _criar_tabelas(cur):
+    # Tabela de empresas
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS empresas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_empresa TEXT NOT NULL,
+            cnpj TEXT,
+            responsavel TEXT,
+            data_cadastro TEXT
+        )
+    """)
+
+    # Tabela de referências (plano contábil)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS referencias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER NOT NULL,
+            nome TEXT NOT NULL,
+            conta_d TEXT,
+            conta_e TEXT,
+            data_cadastro TEXT,
+            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
+        )
+    """)
+
+    # Tabela de classificações (lançamentos)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS classificacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER NOT NULL,
+            descricao TEXT,
+            debito TEXT,
+            credito TEXT,
+            valor_centavos INTEGER NOT NULL DEFAULT 0,
+            data_movimento TEXT,
+            data_processamento TEXT,
+            referencia_sugerida TEXT,
+            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
+        )
+    """)
+
+    # Expurgos em lotes de empresas excluídas (ver expurgo.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS expurgos (
+            empresa_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            removidos INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            data_inicio TEXT,
+            data_fim TEXT
+        )
+    """)
+
+
+def _migrar_referencias(cur):
+    cols = _colunas(cur, "referencias")
+
+    # bancos antigos sem empresa_id: recria a tabela com a estrutura correta
+    if "empresa_id" not in cols:
+        print("⚙️ Atualizando estrutura da tabela 'referencias'...")
+        cur.execute("ALTER TABLE referencias RENAME TO referencias_old")
+        cur.execute("""
+            CREATE TABLE referencias (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                empresa_id INTEGER NOT NULL,
+                nome TEXT NOT NULL,
+                conta_d TEXT,
+                conta_e TEXT,
+                data_cadastro TEXT,
+                FOREIGN KEY (empresa_id) REFERENCES empresas (id)
+            )
+        """)
+        try:
+            copiar = [c for c in ("id", "nome", "conta_d", "conta_e", "data_cadastro") if c in cols]
+            lista = ", ".join(copiar)
+            cur.execute(f"INSERT INTO referencias ({lista}) SELECT {lista} FROM referencias_old")
+        except Exception as e:
+            print("Erro ao migrar dados antigos:", e)
+        cur.execute("DROP TABLE referencias_old")
+        cols = _colunas(cur, "referencias")
+
+    # garantir que a coluna data_cadastro exista
+    if "data_cadastro" not in cols:
+        try:
+            cur.execute("ALTER TABLE referencias ADD COLUMN data_cadastro TEXT")
+            print("Added column data_cadastro to referencias")
+        except Exception as e:
+            print("Could not add column data_cadastro:", e)
+
+
+def _migrar_classificacoes(cur):
+    cols = _colunas(cur, "classificacoes")
+
+    # Adiciona colunas faltantes
+    colunas_necessarias = {
+        "empresa_id": "INTEGER NOT NULL DEFAULT 1",
+        "descricao": "TEXT",
+        "debito": "TEXT",
+        "credito": "TEXT",
+        "valor_centavos": "INTEGER NOT NULL DEFAULT 0",
+        "data_movimento": "TEXT",
+        "data_processamento": "TEXT",
+        # nome da referência quando as contas vieram de uma sugestão por similaridade
+        "referencia_sugerida": "TEXT"
+    }
+
+    for col, tipo in colunas_necessarias.items():
+        if col not in cols:
+            try:
+                cur.execute(f"ALTER TABLE classificacoes ADD COLUMN {col} {tipo}")
+                print(f"✅ Coluna adicionada: {col}")
+            except Exception as e:
+                print(f"⚠️ Erro ao adicionar coluna {col}: {e}")
+
+    # valores em REAL (bancos antigos) passam para centavos inteiros: somas exatas no SQLite
+    if "valor" in cols:
+        print("⚙️ Convertendo 'classificacoes.valor' para centavos...")
+        cur.execute("""
+            UPDATE classificacoes SET valor_centavos = CAST(ROUND(valor * 100) AS INTEGER), valor = NULL
+            WHERE valor IS NOT NULL
+        """)
+        try:
+            cur.execute("ALTER TABLE classificacoes DROP COLUMN valor")
+        except sqlite3.OperationalError as e:
+            # SQLite < 3.35 não remove colunas; a coluna fica vazia e não é mais usada
+            print("⚠️ Não foi possível remover a coluna valor:", e)
+
+
+def _criar_indices(cur):
+    # Consultas e expurgos são sempre por empresa
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_referencias_empresa ON referencias (empresa_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_classificacoes_empresa ON classificacoes (empresa_id)")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_classificacoes_sugerida ON classificacoes (empresa_id, referencia_sugerida)
+        WHERE referencia_sugerida IS NOT NULL
+    """)
+
+
+def _criar_indice_descricoes(cur):
+    """
+    Índice FTS5 (tokenizador trigram) sobre classificacoes.descricao. Permite
+    achar por substring os lançamentos que uma palavra-chave pode afetar sem
+    varrer a tabela. Exclusões e alterações de descrição são refletidas por
+    triggers; inserções, por `inserir_classificacoes`. Sem suporte a FTS5 no
+    SQLite, o índice não é criado.
+    """
+    existia = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE name='classificacoes_fts'"
+    ).fetchone()
+    try:
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS classificacoes_fts USING fts5(
+                descricao, content='classificacoes', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print("⚠️ Índice FTS5 indisponível:", e)
+        return
+
+    # inserções são indexadas em lote por `inserir_classificacoes`: um trigger
+    # AFTER INSERT por linha deixa a carga em massa cerca de 8x mais lenta
+    cur.execute("DROP TRIGGER IF EXISTS classificacoes_fts_ai")
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS classificacoes_fts_ad AFTER DELETE ON classificacoes BEGIN
+            INSERT INTO classificacoes_fts (classificacoes_fts, rowid, descricao)
+            VALUES ('delete', old.id, old.descricao);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS classificacoes_fts_au AFTER UPDATE OF descricao ON classificacoes BEGIN
+            INSERT INTO classificacoes_fts (classificacoes_fts, rowid, descricao)
+            VALUES ('delete', old.id, old.descricao);
+            INSERT INTO classificacoes_fts (rowid, descricao) VALUES (new.id, new.descricao);
+        END
+    """)
+    if not existia:
+        # bancos existentes: indexa os lançamentos já gravados (uma única vez)
+        cur.execute("INSERT INTO classificacoes_fts (classificacoes_fts) VALUES ('rebuild')")
+
+
+def _criar_registro_alteracoes(cur):
+    """
+    `referencias_alteracoes` registra, por triggers, cada versão (nome e contas)
+    de uma regra que entrou ou saiu do plano: a nova na inclusão, a antiga e a
+    nova na alteração, a antiga na exclusão. A reclassificação usa esse registro
+    (e não só o estado inicial e final do plano), porque lançamentos gravados no
+    meio do caminho foram classificados com versões intermediárias.
+    """
+    existia = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE name='referencias_alteracoes'"
+    ).fetchone()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS referencias_alteracoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER NOT NULL,
+            ref_id INTEGER NOT NULL,
+            nome TEXT,
+            conta_d TEXT,
+            conta_e TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_referencias_alteracoes_empresa ON referencias_alteracoes (empresa_id)")
+
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS referencias_alteracoes_ai AFTER INSERT ON referencias BEGIN
+            INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+            VALUES (new.empresa_id, new.id, new.nome, new.conta_d, new.conta_e);
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS referencias_alteracoes_au
+        AFTER UPDATE OF empresa_id, nome, conta_d, conta_e ON referencias BEGIN
+            INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+            VALUES (old.empresa_id, old.id, old.nome, old.conta_d, old.conta_e);
+            INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+            VALUES (new.empresa_id, new.id, new.nome, new.conta_d, new.conta_e);
+        END
+    """)
+    # o expurgo de uma empresa excluída apaga as referências dela: isso não é uma alteração do plano
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS referencias_alteracoes_ad AFTER DELETE ON referencias
+        WHEN EXISTS (SELECT 1 FROM empresas WHERE id = old.empresa_id) BEGIN
+            INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+            VALUES (old.empresa_id, old.id, old.nome, old.conta_d, old.conta_e);
+        END
+    """)
+
+    if existia:
+        return
+    # bancos existentes: fica pendente tudo que difere do último plano aplicado
+    # (`referencias_aplicadas`, usado antes deste registro) ou todo o plano, se não houver
+    aplicadas = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE name='referencias_aplicadas'"
+    ).fetchone()
+    filtro = ""
+    if aplicadas:
+        cur.execute("""
+            INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+            SELECT a.empresa_id, a.ref_id, a.nome, a.conta_d, a.conta_e FROM referencias_aplicadas a
+            WHERE NOT EXISTS (
+                SELECT 1 FROM referencias r WHERE r.id = a.ref_id AND r.empresa_id = a.empresa_id
+                  AND r.nome IS a.nome AND r.conta_d IS a.conta_d AND r.conta_e IS a.conta_e
+            )
+        """)
+        filtro = """
+            WHERE NOT EXISTS (
+                SELECT 1 FROM referencias_aplicadas a WHERE a.ref_id = r.id AND a.empresa_id = r.empresa_id
+                  AND a.nome IS r.nome AND a.conta_d IS r.conta_d AND a.conta_e IS r.conta_e
+            )
+        """
+    cur.execute(f"""
+        INSERT INTO referencias_alteracoes (empresa_id, ref_id, nome, conta_d, conta_e)
+        SELECT r.empresa_id, r.id, r.nome, r.conta_d, r.conta_e FROM referencias r {filtro}
+    """)
+    cur.execute("DROP TABLE IF EXISTS referencias_aplicadas")
+
+
+def inicializar_banco(forcar=False):
+    """Cria e migra as tabelas. Executa apenas na primeira chamada do processo."""
+    global _inicializado
+    if _inicializado and not forcar:
+        return
+    with _lock:
+        if _inicializado and not forcar:
+            return
+        conn = conectar()
+        cur = conn.cursor()
+        _criar_tabelas(cur)
+        _migrar_referencias(cur)
+        _migrar_classificacoes(cur)
+        _criar_indices(cur)
+        _criar_indice_descricoes(cur)
+        _criar_registro_alteracoes(cur)
+        conn.commit()
+        conn.close()
+        _inicializado = True
+
+    # expurgos interrompidos (queda do processo) e dados órfãos são retomados em
+    # segundo plano assim que o processo abre o banco, em qualquer página ou na API
+    import expurgo
+    expurgo.retomar_expurgos()
+
+
+def _tem_indice_descricoes(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='classificacoes_fts'").fetchone() is not None
+
+
+def inserir_classificacoes(linhas):
+    """
+    Insere lançamentos em uma única transação. Cada linha é a tupla
+    (empresa_id, descricao, debito, credito, valor_centavos, data_movimento, data_processamento,
+    referencia_sugerida), com o valor já em centavos inteiros e `referencia_sugerida`
+    None quando as contas não vieram de uma sugestão aplicada.
+
+    Linhas de empresas que não existem mais (excluídas enquanto os lançamentos
+    eram classificados) são descartadas na mesma transação, para não virarem
+    órfãs depois do expurgo. Retorna o conjunto desses IDs de empresa.
+    """
+    linhas = list(linhas)
+    conn = conectar()
+    with conn:
+        # IMMEDIATE: ninguém mais insere entre ler o último id e indexar as novas linhas
+        conn.execute("BEGIN IMMEDIATE")
+        empresas = {linha[0] for linha in linhas}
+        marcadores = ",".join("?" * len(empresas))
+        existentes = {
+            r[0] for r in conn.execute(f"SELECT id FROM empresas WHERE id IN ({marcadores})", list(empresas))
+        }
+        ausentes = empresas - existentes
+        if ausentes:
+            linhas = [linha for linha in linhas if linha[0] not in ausentes]
+        ultimo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM classificacoes").fetchone()[0]
+        conn.executemany(
+            """
+            INSERT INTO classificacoes (
+                empresa_id, descricao, debito, credito, valor_centavos, data_movimento, data_processamento,
+                referencia_sugerida
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            linhas,
+        )
+        if _tem_indice_descricoes(conn):
+            conn.execute(
+                "INSERT INTO classificacoes_fts (rowid, descricao) SELECT id, descricao FROM classificacoes WHERE id > ?",
+                (ultimo_id,),
+            )
+    conn.close()
+    return ausentes
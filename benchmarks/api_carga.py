@@ -0,0 +1,108 @@
+"""
+Benchmark de carga da API de ingestão (api.py).
+
+Sobe o servidor no próprio processo, em uma pasta temporária com um banco novo
+(uma empresa e algumas referências), e dispara clientes HTTP locais simultâneos
+enviando lotes de lançamentos. Mostra lançamentos/s e quantos commits foram
+necessários.
+
+Uso:
+    python benchmarks/api_carga.py [--clientes 16] [--requisicoes 50] [--por-requisicao 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+import banco  # noqa: E402
+
+REFERENCIAS = [
+    ("PIX RECEBIDO", "1.1.1", "3.1.1"),
+    ("TARIFA", "4.1.1", "1.1.1"),
+    ("PAGAMENTO FORNECEDOR", "2.1.3", "1.1.1"),
+]
+DESCRICOES = ["PIX RECEBIDO DE CLIENTE", "TARIFA PACOTE", "PAGAMENTO FORNECEDOR XPTO", "OUTRO"]
+
+
+def preparar_banco():
+    banco.inicializar_banco(forcar=True)
+    conn = banco.conectar()
+    with conn:
+        conn.execute("INSERT INTO empresas (id, nome_empresa) VALUES (1, 'Benchmark')")
+        conn.executemany(
+            "INSERT INTO referencias (empresa_id, nome, conta_d, conta_e) VALUES (1, ?, ?, ?)",
+            REFERENCIAS,
+        )
+    conn.close()
+
+
+async def cliente(porta, requisicoes, por_requisicao):
+    reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+    lancamentos = [
+        {"descricao": DESCRICOES[i % len(DESCRICOES)], "valor": f"{i},50", "data": "15/03/2024"}
+        for i in range(por_requisicao)
+    ]
+    corpo = json.dumps({"lancamentos": lancamentos}).encode()
+    pedido = (
+        f"POST /empresas/1/lancamentos HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n"
+    ).encode() + corpo
+
+    for _ in range(requisicoes):
+        writer.write(pedido)
+        await writer.drain()
+        status = await reader.readline()
+        tamanho = 0
+        while True:
+            h = await reader.readline()
+            if h == b"\r\n":
+                break
+            if h.lower().startswith(b"content-length:"):
+                tamanho = int(h.split(b":")[1])
+        await reader.readexactly(tamanho)
+        if b" 200 " not in status:
+            raise RuntimeError(status.decode().strip())
+    writer.close()
+
+
+async def executar(args):
+    servidor = api.ServidorIngestao()
+    tcp = await servidor.iniciar("127.0.0.1", 0)
+    porta = tcp.sockets[0].getsockname()[1]
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[
+        cliente(porta, args.requisicoes, args.por_requisicao) for _ in range(args.clientes)
+    ])
+    duracao = time.perf_counter() - inicio
+    await servidor.encerrar()
+
+    total = args.clientes * args.requisicoes * args.por_requisicao
+    conn = banco.conectar()
+    gravados = conn.execute("SELECT COUNT(*) FROM classificacoes").fetchone()[0]
+    conn.close()
+    print(f"{total} lançamentos em {duracao:.2f}s → {total / duracao:,.0f} lançamentos/s")
+    print(f"{servidor.gravador.commits} commits, {gravados} linhas no banco")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clientes", type=int, default=16)
+    parser.add_argument("--requisicoes", type=int, default=50)
+    parser.add_argument("--por-requisicao", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        banco.CAMINHO_BANCO = os.path.join(pasta, "vledger.db")
+        preparar_banco()
+        asyncio.run(executar(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark de inicialização: mede o tempo até a primeira renderização de cada página.
+
+Cada página roda em um processo Python novo (partida a frio, como um container
+recém-criado), via `streamlit.testing.v1.AppTest`, em uma pasta temporária com
+uma cópia de `vledger.db` para não alterar o banco do projeto.
+
+Uso:
+    python benchmarks/tempo_inicial.py [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ["vledger.py", "pages/empresas.py", "pages/referencia.py", "pages/classificacao.py"]
+
+# Executado em cada processo filho: importa o Streamlit (custo fixo, medido à
+# parte) e então roda a página duas vezes (primeira renderização e re-renderização).
+MEDICAO = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+t2 = time.perf_counter()
+at.run()
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_streamlit": t1 - t0,
+    "primeira": t2 - t1,
+    "rerun": t3 - t2,
+    "pandas": "pandas" in sys.modules,
+    "erros": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def medir(pagina, pasta):
+    env = dict(os.environ, PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    saida = subprocess.run(
+        [sys.executable, "-c", MEDICAO, os.path.join(RAIZ, pagina)],
+        cwd=pasta, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        banco = os.path.join(RAIZ, "vledger.db")
+        if os.path.exists(banco):
+            shutil.copy(banco, pasta)
+
+        print(f"{'página':<26}{'1ª render (ms)':>16}{'rerun (ms)':>12}{'pandas?':>9}")
+        for pagina in PAGINAS:
+            medidas = [medir(pagina, pasta) for _ in range(args.repeticoes)]
+            primeira = statistics.median(m["primeira"] for m in medidas) * 1000
+            rerun = statistics.median(m["rerun"] for m in medidas) * 1000
+            pandas = "sim" if medidas[-1]["pandas"] else "não"
+            print(f"{pagina:<26}{primeira:>16.1f}{rerun:>12.1f}{pandas:>9}")
+            for erro in medidas[-1]["erros"]:
+                print(f"    ⚠️ {erro}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import leitura
+import similaridade
+
+# ==========================================================
+# Motor de classificação compartilhado pelas páginas do Vledger
+# ==========================================================
+# Leitura de extratos, detecção de colunas, normalização e correspondência
+# com o plano de referências da empresa. Não depende do Streamlit, então pode
+# ser usado por threads de processamento e por outros serviços.
+
+MAX_WORKERS = 4
+
+
+# ==========================================================
+# UTILITÁRIAS: detectar colunas e normalizar dados
+# ==========================================================
+def find_column(columns, candidates):
+    cols_lower = [c.lower() for c in columns]
+    for cand in candidates:
+        for i, c in enumerate(cols_lower):
+            if cand in c:
+                return columns[i]  # retorna nome original
+    return None
+
+def parse_number(value):
+    """Tenta converter vários formatos numéricos (BR e EN)."""
+    if pd.isna(value):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value).strip()
+    if s == "":
+        return 0.0
+    # remove currency symbols and spaces
+    s = s.replace("R$", "").replace("$", "").strip()
+    # if contains both '.' and ',', likely BR format like '1.234,56'
+    if "." in s and "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    else:
+        # if only comma, treat as decimal separator
+        if "," in s and "." not in s:
+            s = s.replace(",", ".")
+        # if only dots, keep as is (thousands maybe missing)
+    try:
+        return float(s)
+    except:
+        # fallback: try removing non-digits
+        s2 = re.sub(r"[^\d\.\\-]", "", s)
+        try:
+            return float(s2)
+        except:
+            return 0.0
+
+def parse_numbers(series):
+    """Versão vetorizada de `parse_number` para uma coluna inteira."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(0.0)
+    s = series.astype(str).str.strip()
+    s = s.str.replace("R$", "", regex=False).str.replace("$", "", regex=False).str.strip()
+    tem_ponto = s.str.contains(".", regex=False)
+    tem_virgula = s.str.contains(",", regex=False)
+    # '1.234,56' (BR): remove milhar e troca a vírgula decimal
+    br = tem_ponto & tem_virgula
+    s = s.where(~br, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    # só vírgula: vírgula é o separador decimal
+    s = s.where(~(tem_virgula & ~tem_ponto), s.str.replace(",", ".", regex=False))
+    numeros = pd.to_numeric(s, errors="coerce")
+    # fallback: remove tudo que não é dígito, ponto ou sinal
+    faltantes = numeros.isna() & series.notna()
+    if faltantes.any():
+        limpos = s[faltantes].str.replace(r"[^\d\.\-]", "", regex=True)
+        numeros[faltantes] = pd.to_numeric(limpos, errors="coerce")
+    return numeros.astype(float).fillna(0.0)
+
+def para_centavos(series):
+    """Converte uma coluna de valores (números ou texto BR/EN) em centavos inteiros."""
+    return (parse_numbers(series) * 100).round().astype("int64")
+
+def parse_centavos(value):
+    """Versão escalar de `para_centavos`."""
+    return int(round(parse_number(value) * 100))
+
+def parse_date(value):
+    """Tenta converter vários formatos de data para pd.Timestamp ou None."""
+    if pd.isna(value):
+        return None
+    try:
+        # tenta conversão direta (aceita várias formas)
+        dt = pd.to_datetime(value, dayfirst=True, errors="coerce")
+        return dt
+    except:
+        return None
+
+
+# ==========================================================
+# LEITURA DO EXTRATO
+# ==========================================================
+def read_table(uploaded_file):
+    """Lê CSV, XLSX ou OFX a partir de um arquivo enviado (objeto com `.name`)."""
+    if uploaded_file is None:
+        return None
+    if hasattr(uploaded_file, "getvalue"):
+        conteudo = uploaded_file.getvalue()
+    else:
+        conteudo = uploaded_file.read()
+    return leitura.ler_extrato(uploaded_file.name, conteudo)
+
+def read_bytes(nome, conteudo):
+    """Lê um extrato a partir do nome e do conteúdo em bytes."""
+    return leitura.ler_extrato(nome, conteudo)
+
+
+# ==========================================================
+# NORMALIZAÇÃO E CORRESPONDÊNCIA
+# ==========================================================
+def normalizar_extrato(df):
+    """
+    Detecta as colunas de descrição, data e valor e devolve um DataFrame com
+    `descricao`, `valor` e `data_movimento`, além da lista de avisos gerados.
+    """
+    avisos = []
+
+    desc_col = find_column(df.columns, ["descr", "description", "hist", "histórico", "historico"])
+    date_col = find_column(df.columns, ["data", "date", "dt"])
+    val_col  = find_column(df.columns, ["valor", "value", "amount", "amt", "vlr"])
+
+    if desc_col is None:
+        # fallback para segunda coluna
+        if len(df.columns) >= 2:
+            desc_col = df.columns[1]
+            avisos.append(f"Não encontrei coluna de descrição. Usando: {desc_col}")
+        else:
+            raise ValueError("Não foi possível identificar a coluna de descrição no extrato.")
+
+    descricao = df[desc_col].astype(str)
+
+    # normaliza valor (colunas já tipadas na leitura passam direto)
+    if val_col is not None:
+        valor = parse_numbers(df[val_col])
+    else:
+        valor = pd.Series(0.0, index=df.index)
+
+    # normaliza data
+    if date_col is not None:
+        if pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            data = df[date_col]
+        else:
+            data = pd.to_datetime(df[date_col], dayfirst=True, errors="coerce")
+    else:
+        # tenta detectar colunas com formato data mesmo se nome não óbvio
+        data = pd.Series(pd.NaT, index=df.index)
+        for c in df.columns:
+            parsed = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
+            if parsed.notna().sum() > 0:
+                data = parsed
+                break
+
+    normalizado = pd.DataFrame({
+        "descricao": descricao,
+        "valor": valor,
+        "data_movimento": data,
+    })
+    return normalizado, avisos
+
+def classificar(df, refs):
+    """
+    Preenche `debito` e `credito` usando a primeira referência (na ordem de `refs`)
+    cujo nome aparece na descrição. `refs` é uma lista de (nome, conta_d, conta_e).
+    """
+    df = df.copy()
+    desc = df["descricao"].astype(str).str.lower()
+    debito = pd.Series("", index=df.index, dtype=object)
+    credito = pd.Series("", index=df.index, dtype=object)
+    pendente = pd.Series(True, index=df.index)
+
+    # Uma passada vetorizada por referência, apenas sobre as linhas ainda sem conta
+    for nome, conta_d, conta_e in refs:
+        if nome is None:
+            continue
+        if not pendente.any():
+            break
+        alvo = desc[pendente]
+        achou = alvo.str.contains(nome.lower(), regex=False)
+        idx = alvo.index[achou.to_numpy()]
+        debito.loc[idx] = conta_d
+        credito.loc[idx] = conta_e
+        pendente.loc[idx] = False
+
+    df["debito"] = debito
+    df["credito"] = credito
+    return df[["descricao", "debito", "credito", "valor", "data_movimento"]], int((~pendente).sum())
+
+
+def preparar_referencias(refs):
+    """Referências com o nome já em minúsculas, para `classificar_descricao`."""
+    return [(nome.lower(), conta_d, conta_e) for nome, conta_d, conta_e in refs if nome is not None]
+
+def classificar_descricao(descricao, refs_preparadas):
+    """
+    Mesma regra de `classificar` para uma única descrição, sem pandas (lotes
+    pequenos, como os da API). Retorna (debito, credito), vazios se nada casar.
+    """
+    desc = str(descricao).lower()
+    for nome, conta_d, conta_e in refs_preparadas:
+        if nome in desc:
+            return conta_d, conta_e
+    return "", ""
+
+
+# ==========================================================
+# PROCESSAMENTO DE VÁRIOS ARQUIVOS
+# ==========================================================
+def processar_arquivo(nome, conteudo, refs, indice=None,
+                      limiar=similaridade.LIMIAR_SUGESTAO, aplicar_sugestoes=False):
+    """
+    Lê, normaliza e classifica um arquivo. Se `indice` for informado, as linhas
+    sem correspondência exata recebem a referência mais parecida como sugestão.
+    Retorna (DataFrame, resumo).
+    """
+    inicio = time.perf_counter()
+    resumo = {"arquivo": nome, "linhas": 0, "classificadas": 0, "sem_classificacao": 0,
+              "sugeridas": 0, "tempo_s": 0.0, "avisos": "", "erro": ""}
+    try:
+        df = read_bytes(nome, conteudo)
+        normalizado, avisos = normalizar_extrato(df)
+        classificado, classificadas = classificar(normalizado, refs)
+        sugeridas = 0
+        if indice is not None:
+            classificado, sugeridas = similaridade.completar_com_sugestoes(
+                classificado, indice, limiar=limiar, aplicar=aplicar_sugestoes
+            )
+            if aplicar_sugestoes:
+                classificadas += sugeridas
+        classificado.insert(0, "arquivo", nome)
+        resumo.update(
+            linhas=len(classificado),
+            classificadas=classificadas,
+            sem_classificacao=len(classificado) - classificadas,
+            sugeridas=sugeridas,
+            avisos="; ".join(avisos),
+        )
+    except Exception as e:
+        classificado = None
+        resumo["erro"] = str(e)
+    resumo["tempo_s"] = round(time.perf_counter() - inicio, 3)
+    return classificado, resumo
+
+def processar_arquivos(arquivos, refs, max_workers=MAX_WORKERS, sugerir=True,
+                       limiar=similaridade.LIMIAR_SUGESTAO, aplicar_sugestoes=False):
+    """
+    Processa vários arquivos em paralelo. `arquivos` é uma lista de (nome, bytes).
+    O índice de similaridade das referências é montado uma vez e compartilhado.
+    Retorna o DataFrame concatenado (ou None) e a lista de resumos por arquivo,
+    na mesma ordem de entrada.
+    """
+    if not arquivos:
+        return None, []
+    indice = similaridade.construir_indice(refs) if sugerir else None
+
+    def tarefa(arquivo):
+        return processar_arquivo(arquivo[0], arquivo[1], refs, indice=indice,
+                                 limiar=limiar, aplicar_sugestoes=aplicar_sugestoes)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(arquivos))) as pool:
+        resultados = list(pool.map(tarefa, arquivos))
+
+    frames = [df for df, _ in resultados if df is not None and not df.empty]
+    resumos = [resumo for _, resumo in resultados]
+    combinado = pd.concat(frames, ignore_index=True) if frames else None
+    return combinado, resumos
@@ -0,0 +1,190 @@
+import threading
+import time
+from datetime import datetime
+
+from banco import conectar, inicializar_banco
+
+# =========================================
+# Expurgo em lotes dos dados de empresas excluídas
+# =========================================
+# Excluir uma empresa remove apenas a linha em `empresas` e registra um
+# expurgo pendente na mesma transação. Um worker em segundo plano apaga
+# `classificacoes` e `referencias` daquela empresa em lotes pequenos, cada
+# um em sua própria transação, para não travar o banco para os demais
+# usuários. O progresso fica na tabela `expurgos`, então um expurgo
+# interrompido (queda do processo) é retomado na próxima inicialização.
+
+TAMANHO_LOTE = 5000
+PAUSA_ENTRE_LOTES = 0.05  # segundos; libera o lock de escrita entre lotes
+TABELAS_DEPENDENTES = ("classificacoes", "referencias")
+
+_lock = threading.Lock()
+_em_execucao = set()
+_retomada_iniciada = False
+
+
+def _contar_dependentes(conn, empresa_id):
+    total = 0
+    for tabela in TABELAS_DEPENDENTES:
+        total += conn.execute(
+            f"SELECT COUNT(*) FROM {tabela} WHERE empresa_id=?", (empresa_id,)
+        ).fetchone()[0]
+    return total
+
+
+def _registrar_expurgo(conn, empresa_id):
+    agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(
+        """
+        INSERT INTO expurgos (empresa_id, total, removidos, status, data_inicio, data_fim)
+        VALUES (?, ?, 0, 'pendente', ?, NULL)
+        ON CONFLICT(empresa_id) DO UPDATE SET
+            total = excluded.total, removidos = 0, status = 'pendente',
+            data_inicio = excluded.data_inicio, data_fim = NULL
+        """,
+        (empresa_id, _contar_dependentes(conn, empresa_id), agora),
+    )
+
+
+def excluir_empresa_com_expurgo(emp_id):
+    """Exclui a empresa e agenda o expurgo dos dados dependentes."""
+    inicializar_banco()
+    conn = conectar()
+    with conn:
+        conn.execute("DELETE FROM empresas WHERE id=?", (emp_id,))
+        conn.execute("DELETE FROM referencias_alteracoes WHERE empresa_id=?", (emp_id,))
+        _registrar_expurgo(conn, emp_id)
+    conn.close()
+    iniciar_expurgo(emp_id)
+
+
+def agendar_orfaos(conn):
+    """Agenda expurgo para dados cuja empresa já não existe. Retorna os IDs agendados."""
+    ids = set()
+    for tabela in TABELAS_DEPENDENTES:
+        rows = conn.execute(f"""
+            SELECT DISTINCT t.empresa_id FROM {tabela} t
+            WHERE NOT EXISTS (SELECT 1 FROM empresas e WHERE e.id = t.empresa_id)
+        """).fetchall()
+        ids.update(r[0] for r in rows)
+
+    pendentes = {
+        r[0] for r in conn.execute("SELECT empresa_id FROM expurgos WHERE status='pendente'")
+    }
+    novos = sorted(ids - pendentes)
+    with conn:
+        for empresa_id in novos:
+            _registrar_expurgo(conn, empresa_id)
+    return novos
+
+
+def executar_expurgo(empresa_id, tamanho_lote=TAMANHO_LOTE, pausa=PAUSA_ENTRE_LOTES, progresso=None):
+    """
+    Remove os dados dependentes da empresa em lotes de `tamanho_lote` linhas.
+    Cada lote é uma transação curta que também atualiza o progresso em `expurgos`.
+    `progresso(removidos, total)` é chamado após cada lote, se informado.
+    """
+    inicializar_banco()
+    conn = conectar()
+    try:
+        row = conn.execute(
+            "SELECT total, removidos FROM expurgos WHERE empresa_id=?", (empresa_id,)
+        ).fetchone()
+        total, removidos = row if row else (0, 0)
+
+        for tabela in TABELAS_DEPENDENTES:
+            while True:
+                with conn:
+                    cur = conn.execute(
+                        f"""
+                        DELETE FROM {tabela} WHERE id IN (
+                            SELECT id FROM {tabela} WHERE empresa_id=? LIMIT ?
+                        )
+                        """,
+                        (empresa_id, tamanho_lote),
+                    )
+                    apagados = cur.rowcount
+                    removidos += apagados
+                    conn.execute(
+                        "UPDATE expurgos SET removidos=? WHERE empresa_id=?",
+                        (removidos, empresa_id),
+                    )
+                if progresso is not None:
+                    progresso(removidos, max(total, removidos))
+                if apagados < tamanho_lote:
+                    break
+                if pausa:
+                    time.sleep(pausa)
+
+        with conn:
+            conn.execute(
+                "UPDATE expurgos SET status='concluido', total=?, data_fim=? WHERE empresa_id=?",
+                (max(total, removidos), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), empresa_id),
+            )
+        return removidos
+    finally:
+        conn.close()
+
+
+def _worker(empresa_id):
+    try:
+        executar_expurgo(empresa_id)
+    except Exception as e:
+        # O registro continua 'pendente' e será retomado na próxima inicialização
+        print(f"⚠️ Expurgo da empresa {empresa_id} interrompido: {e}")
+    finally:
+        with _lock:
+            _em_execucao.discard(empresa_id)
+
+
+def iniciar_expurgo(empresa_id):
+    """Dispara o expurgo em uma thread de fundo (no máximo uma por empresa)."""
+    with _lock:
+        if empresa_id in _em_execucao:
+            return False
+        _em_execucao.add(empresa_id)
+    threading.Thread(target=_worker, args=(empresa_id,), daemon=True).start()
+    return True
+
+
+def _retomar():
+    try:
+        inicializar_banco()
+        conn = conectar()
+        try:
+            agendar_orfaos(conn)
+            pendentes = [
+                r[0] for r in conn.execute("SELECT empresa_id FROM expurgos WHERE status='pendente'")
+            ]
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Não foi possível retomar os expurgos: {e}")
+        return
+    for empresa_id in pendentes:
+        iniciar_expurgo(empresa_id)
+
+
+def retomar_expurgos():
+    """
+    Agenda os dados órfãos deixados por exclusões antigas e retoma os expurgos
+    pendentes, em uma thread de fundo e uma única vez por processo. Chamado por
+    `banco.inicializar_banco()`, então vale para o Streamlit e para a API.
+    """
+    global _retomada_iniciada
+    with _lock:
+        if _retomada_iniciada:
+            return False
+        _retomada_iniciada = True
+    threading.Thread(target=_retomar, daemon=True).start()
+    return True
+
+
+def listar_expurgos():
+    inicializar_banco()
+    conn = conectar()
+    rows = conn.execute(
+        "SELECT empresa_id, total, removidos, status, data_inicio, data_fim FROM expurgos ORDER BY data_inicio DESC"
+    ).fetchall()
+    conn.close()
+    return rows
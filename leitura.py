@@ -0,0 +1,293 @@
+import csv
+import io
+import re
+from collections import Counter
+
+import pandas as pd
+
+# ==========================================================
+# Leitura de extratos: CSV (com detecção de formato), XLSX e OFX
+# ==========================================================
+# Exportações de bancos brasileiros costumam vir com `;` como separador,
+# codificação latin-1/cp1252 e vírgula decimal. Em vez de ler tudo como
+# texto e converter célula a célula depois, a codificação é conferida no
+# arquivo inteiro e uma amostra é usada para descobrir separador, linha de
+# cabeçalho, separadores numéricos e formato das datas. Esses parâmetros vão direto para o parser
+# (engine pyarrow quando disponível, senão o engine C), com tipos explícitos
+# para as colunas de valor, e as datas são convertidas com o formato detectado.
+
+AMOSTRA_BYTES = 64 * 1024
+DELIMITADORES = ";,\t|"
+FORMATOS_DATA = ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d")
+
+_RE_NUMERO = re.compile(r"^[-+]?\d[\d.,]*$")
+
+
+# ==========================================================
+# DETECÇÃO DE FORMATO
+# ==========================================================
+def detectar_codificacao(conteudo):
+    """
+    UTF-8 (com ou sem BOM) se o conteúdo inteiro for válido; senão cp1252/latin-1.
+    O arquivo todo é conferido (decodificar é barato perto do parse): extratos
+    cp1252 costumam ter o primeiro acento só no fim, fora de qualquer amostra.
+    """
+    for codificacao in ("utf-8-sig", "cp1252"):
+        try:
+            conteudo.decode(codificacao)
+            return codificacao
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+def detectar_delimitador(linhas):
+    try:
+        return csv.Sniffer().sniff("\n".join(linhas[:50]), delimiters=DELIMITADORES).delimiter
+    except csv.Error:
+        # fallback: o delimitador que aparece o mesmo número de vezes (> 0) em mais linhas
+        def consistencia(d):
+            contagem = Counter(l.count(d) for l in linhas if l.strip())
+            vezes, linhas_iguais = contagem.most_common(1)[0] if contagem else (0, 0)
+            return (linhas_iguais, vezes) if vezes > 0 else (0, 0)
+        return max(DELIMITADORES, key=consistencia)
+
+def detectar_cabecalho(registros):
+    """Índice da linha de cabeçalho: a primeira com o número de campos mais comum."""
+    tamanhos = Counter(len(r) for r in registros if any(c.strip() for c in r))
+    if not tamanhos:
+        return 0
+    campos = tamanhos.most_common(1)[0][0]
+    for i, r in enumerate(registros):
+        if len(r) == campos:
+            return i
+    return 0
+
+def _limpar_numero(valor):
+    return valor.strip().replace(" ", "")
+
+def detectar_separadores(valores):
+    """
+    Decide o separador decimal e o de milhar a partir de valores numéricos em texto.
+    Retorna (decimal, milhar), com milhar None quando não aparece.
+    """
+    votos_decimal = Counter()
+    milhares = Counter()
+    for v in valores:
+        v = _limpar_numero(v).lstrip("+-")
+        tem_ponto, tem_virgula = "." in v, "," in v
+        if tem_ponto and tem_virgula:
+            decimal = "," if v.rfind(",") > v.rfind(".") else "."
+            votos_decimal[decimal] += 1
+            milhares["." if decimal == "," else ","] += 1
+        elif tem_virgula:
+            # '1,234' sozinho é ambíguo; vírgula com 1-2 casas é decimal
+            if re.fullmatch(r"\d+,\d{1,2}", v):
+                votos_decimal[","] += 1
+            elif re.fullmatch(r"\d{1,3}(,\d{3})+", v) and v.count(",") > 1:
+                milhares[","] += 1
+            else:
+                votos_decimal[","] += 1
+        elif tem_ponto:
+            if re.fullmatch(r"\d{1,3}(\.\d{3}){2,}", v):
+                milhares["."] += 1
+            else:
+                votos_decimal["."] += 1
+
+    decimal = votos_decimal.most_common(1)[0][0] if votos_decimal else "."
+    milhar = None
+    for sep, _ in milhares.most_common():
+        if sep != decimal:
+            milhar = sep
+            break
+    return decimal, milhar
+
+def detectar_formato_data(valores):
+    """Primeiro formato de `FORMATOS_DATA` que interpreta todos os valores, ou None."""
+    from datetime import datetime
+
+    valores = [v.strip() for v in valores if v.strip()]
+    if not valores:
+        return None
+    for formato in FORMATOS_DATA:
+        try:
+            for v in valores:
+                datetime.strptime(v, formato)
+            return formato
+        except ValueError:
+            continue
+    return None
+
+
+def detectar_formato_csv(conteudo):
+    """
+    Analisa uma amostra do CSV e devolve um dicionário com `encoding`, `sep`,
+    `skiprows`, `decimal`, `thousands`, `colunas_valor`, `colunas_texto` e
+    `colunas_data` (nome da coluna -> formato).
+    """
+    encoding = detectar_codificacao(conteudo)
+    amostra = conteudo[:AMOSTRA_BYTES]
+    texto = amostra.decode(encoding, errors="replace")
+    linhas = texto.splitlines()
+    if len(conteudo) > AMOSTRA_BYTES and len(linhas) > 1:
+        linhas = linhas[:-1]  # última linha da amostra pode estar incompleta
+
+    sep = detectar_delimitador(linhas)
+    registros = list(csv.reader(linhas, delimiter=sep))
+    inicio = detectar_cabecalho(registros)
+    cabecalho = registros[inicio] if registros else []
+    dados = [r for r in registros[inicio + 1:] if len(r) == len(cabecalho)]
+
+    colunas_numericas = []
+    colunas_data = {}
+    colunas_texto = []
+    valores_numericos = []
+    for j, nome in enumerate(cabecalho):
+        valores = [r[j] for r in dados if r[j].strip()]
+        if not valores:
+            continue
+        formato = detectar_formato_data(valores)
+        if formato:
+            colunas_data[nome] = formato
+        elif all(_RE_NUMERO.match(_limpar_numero(v)) for v in valores):
+            # colunas sem separador (documentos, contas) continuam como texto
+            if any(("," in v or "." in v) for v in valores):
+                colunas_numericas.append(nome)
+                valores_numericos.extend(valores)
+            else:
+                colunas_texto.append(nome)
+        else:
+            colunas_texto.append(nome)
+
+    # os valores já vêm sem aspas do csv.reader: vírgula decimal num CSV separado
+    # por vírgula é válida ("1.234,56") e os parsers a aceitam em campos entre aspas
+    decimal, milhar = detectar_separadores(valores_numericos)
+    if milhar == decimal:
+        milhar = None
+    return {
+        "encoding": encoding,
+        "sep": sep,
+        "skiprows": inicio,
+        "decimal": decimal,
+        "thousands": milhar,
+        "colunas_valor": colunas_numericas,
+        "colunas_data": colunas_data,
+        "colunas_texto": colunas_texto,
+    }
+
+
+# ==========================================================
+# LEITORES
+# ==========================================================
+def _ler_csv_pyarrow(conteudo, formato):
+    """Parser nativo do pyarrow, com os tipos de cada coluna definidos na leitura."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    tipos = {c: pa.float64() for c in formato["colunas_valor"]}
+    tipos.update({c: pa.string() for c in formato["colunas_texto"]})
+    tipos.update({c: pa.timestamp("s") for c in formato["colunas_data"]})
+    encoding = "utf8" if formato["encoding"] == "utf-8-sig" else formato["encoding"]
+
+    tabela = pa_csv.read_csv(
+        io.BytesIO(conteudo),
+        read_options=pa_csv.ReadOptions(encoding=encoding, skip_rows=formato["skiprows"]),
+        parse_options=pa_csv.ParseOptions(delimiter=formato["sep"]),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=tipos,
+            decimal_point=formato["decimal"],
+            timestamp_parsers=sorted(set(formato["colunas_data"].values())),
+            strings_can_be_null=True,
+        ),
+    )
+    return tabela.to_pandas()
+
+def _ler_csv_c(conteudo, formato):
+    """Engine C do pandas (usado sem pyarrow ou com separador de milhar)."""
+    df = pd.read_csv(
+        io.BytesIO(conteudo),
+        sep=formato["sep"],
+        encoding=formato["encoding"],
+        skiprows=formato["skiprows"],
+        decimal=formato["decimal"],
+        thousands=formato["thousands"],
+        dtype={
+            **{c: "float64" for c in formato["colunas_valor"]},
+            **{c: str for c in formato["colunas_texto"]},
+        },
+    )
+    for coluna, formato_data in formato["colunas_data"].items():
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna], format=formato_data, errors="coerce")
+    return df
+
+def ler_csv(conteudo, tipar=True):
+    """
+    Lê um CSV (bytes) com formato detectado e colunas de valor/data já tipadas.
+    Com `tipar=False` todas as colunas ficam como texto (ex.: códigos de conta
+    como '2.1', que não devem virar número).
+    """
+    formato = detectar_formato_csv(conteudo)
+    if not tipar:
+        formato["colunas_texto"] += formato["colunas_valor"] + list(formato["colunas_data"])
+        formato["colunas_valor"], formato["colunas_data"] = [], {}
+
+    try:
+        # o pyarrow não tem opção de separador de milhar; nesse caso usa o engine C
+        if formato["thousands"] is None:
+            try:
+                df = _ler_csv_pyarrow(conteudo, formato)
+            except ImportError:
+                df = _ler_csv_c(conteudo, formato)
+        else:
+            df = _ler_csv_c(conteudo, formato)
+    except ValueError:
+        # linhas fora do padrão da amostra (valor/data que não converte, número de
+        # campos diferente): lê tudo como texto e deixa a normalização converter.
+        # Erros do pandas/pyarrow na conversão são subclasses de ValueError.
+        df = pd.read_csv(
+            io.BytesIO(conteudo), sep=formato["sep"], encoding=formato["encoding"],
+            skiprows=formato["skiprows"], dtype=str,
+        )
+
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+def ler_ofx(conteudo):
+    """Lê as transações (<STMTTRN>) de um arquivo OFX, em SGML (v1) ou XML (v2)."""
+    cabecalho = conteudo[:1024].decode("ascii", errors="ignore").upper()
+    encoding = "utf-8" if "UTF-8" in cabecalho else "cp1252"
+    texto = conteudo.decode(encoding, errors="replace")
+
+    blocos = re.findall(
+        r"<STMTTRN>(.*?)(?=</STMTTRN>|<STMTTRN>|</BANKTRANLIST>|\Z)", texto, flags=re.S | re.I
+    )
+
+    def campo(bloco, tag):
+        m = re.search(rf"<{tag}>([^<\r\n]*)", bloco, flags=re.I)
+        return m.group(1).strip() if m else ""
+
+    registros = []
+    for bloco in blocos:
+        registros.append({
+            "Data": campo(bloco, "DTPOSTED")[:8],
+            "Descrição": campo(bloco, "MEMO") or campo(bloco, "NAME"),
+            "Valor": campo(bloco, "TRNAMT").replace(",", "."),
+            "Tipo": campo(bloco, "TRNTYPE"),
+            "Documento": campo(bloco, "FITID") or campo(bloco, "CHECKNUM"),
+        })
+
+    df = pd.DataFrame(registros, columns=["Data", "Descrição", "Valor", "Tipo", "Documento"])
+    df["Data"] = pd.to_datetime(df["Data"], format="%Y%m%d", errors="coerce")
+    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    return df
+
+def ler_extrato(nome, conteudo, tipar=True):
+    """Lê um extrato (CSV, XLSX/XLS ou OFX) a partir do nome e do conteúdo em bytes."""
+    nome = nome.lower()
+    if nome.endswith(".csv") or nome.endswith(".txt"):
+        return ler_csv(conteudo, tipar=tipar)
+    elif nome.endswith(".xlsx") or nome.endswith(".xls"):
+        return pd.read_excel(io.BytesIO(conteudo))
+    elif nome.endswith(".ofx"):
+        return ler_ofx(conteudo)
+    raise ValueError(f"Formato de arquivo não suportado: {nome}")
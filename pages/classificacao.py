@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
 import io
 from datetime import datetime
+from banco import conectar, inicializar_banco, inserir_classificacoes
+from similaridade import LIMIAR_SUGESTAO
+
+# pandas e o motor de classificação são importados apenas quando usados,
+# para que a página apareça antes de carregar as bibliotecas pesadas
 
 st.set_page_config(page_title="Classificação | Vledger", page_icon="⚙️", layout="wide")
 st.title("⚙️ Classificação de Lançamentos")
@@ -11,56 +14,8 @@ st.caption("Classifique o extrato com base no plano contábil da empresa selecio
 # ==========================================================
 # BANCO DE DADOS
 # ==========================================================
-def conectar():
-    return sqlite3.connect("vledger.db")
-
-def inicializar_tabela_classificacoes():
-    conn = conectar()
-    cur = conn.cursor()
-
-    # Cria tabela se não existir
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS classificacoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER NOT NULL,
-            descricao TEXT,
-            debito TEXT,
-            credito TEXT,
-            valor REAL,
-            data_movimento TEXT,
-            data_processamento TEXT,
-            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
-        )
-    """)
-
-    # Verifica colunas existentes
-    cur.execute("PRAGMA table_info(classificacoes)")
-    cols = [row[1] for row in cur.fetchall()]
-
-    # Adiciona colunas faltantes
-    colunas_necessarias = {
-        "empresa_id": "INTEGER NOT NULL DEFAULT 1",
-        "descricao": "TEXT",
-        "debito": "TEXT",
-        "credito": "TEXT",
-        "valor": "REAL",
-        "data_movimento": "TEXT",
-        "data_processamento": "TEXT"
-    }
-
-    for col, tipo in colunas_necessarias.items():
-        if col not in cols:
-            try:
-                cur.execute(f"ALTER TABLE classificacoes ADD COLUMN {col} {tipo}")
-                print(f"✅ Coluna adicionada: {col}")
-            except Exception as e:
-                print(f"⚠️ Erro ao adicionar coluna {col}: {e}")
-
-    conn.commit()
-    conn.close()
-
-# Executa a verificação automática da tabela
-inicializar_tabela_classificacoes()
+# Garante as tabelas (uma vez por processo)
+inicializar_banco()
 
 
 def listar_empresas():
@@ -79,109 +34,84 @@ def listar_referencias(empresa_id):
     return refs
 
 def salvar_classificacoes_db(empresa_id, df):
-    """Salva DataFrame já normalizado (colunas: descricao, debito, credito, valor, data_movimento)"""
+    """
+    Salva DataFrame já normalizado (colunas: descricao, debito, credito, valor, data_movimento)
+    em uma única transação, com inserção em lote. O valor é gravado em centavos inteiros.
+    """
+    import pandas as pd
+    from classificador import para_centavos
+
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    data_proc = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    descricao = df["descricao"].fillna("").astype(str).str[:1000]
+    debito = df["debito"].fillna("").astype(str)
+    credito = df["credito"].fillna("").astype(str)
+    valor_centavos = para_centavos(df["valor"])
+    data_mov = (
+        pd.to_datetime(df["data_movimento"], errors="coerce")
+        .dt.strftime("%Y-%m-%d")
+        .fillna(hoje)
+    )
+
+    # guarda a referência das sugestões aplicadas para a reclassificação encontrá-las
+    if "sugestao_aplicada" in df.columns:
+        sugerida = df["sugestao"].astype(object).where(df["sugestao_aplicada"].fillna(False).astype(bool), None)
+    else:
+        sugerida = [None] * len(df)
+
+    linhas = zip(
+        [empresa_id] * len(df), descricao, debito, credito, valor_centavos, data_mov, [data_proc] * len(df),
+        sugerida,
+    )
+    if inserir_classificacoes(linhas):
+        raise ValueError("a empresa foi excluída; nenhum lançamento foi gravado")
+
+
+def existem_classificacoes(empresa_id):
     conn = conectar()
-    cur = conn.cursor()
-    for _, row in df.iterrows():
-        descricao = str(row.get("descricao", ""))[:1000]
-        debito = str(row.get("debito", ""))
-        credito = str(row.get("credito", ""))
-        try:
-            valor = float(row.get("valor", 0.0)) if pd.notna(row.get("valor")) else 0.0
-        except Exception:
-            valor = 0.0
-        data_mov = row.get("data_movimento")
-        if pd.isna(data_mov) or data_mov is None:
-            data_mov = datetime.now().strftime("%Y-%m-%d")
-        elif isinstance(data_mov, pd.Timestamp):
-            data_mov = data_mov.strftime("%Y-%m-%d")
-        elif isinstance(data_mov, str):
-            # assume already in iso or user input
-            try:
-                _ = pd.to_datetime(data_mov)
-                data_mov = pd.to_datetime(data_mov).strftime("%Y-%m-%d")
-            except Exception:
-                data_mov = datetime.now().strftime("%Y-%m-%d")
-
-        data_proc = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cur.execute(
-            """
-            INSERT INTO classificacoes (empresa_id, descricao, debito, credito, valor, data_movimento, data_processamento)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (empresa_id, descricao, debito, credito, valor, data_mov, data_proc)
-        )
-    conn.commit()
+    row = conn.execute("SELECT 1 FROM classificacoes WHERE empresa_id=? LIMIT 1", (empresa_id,)).fetchone()
     conn.close()
-
+    return row is not None
 
 def listar_classificacoes(empresa_id):
+    import pandas as pd
+
     conn = conectar()
     try:
         df = pd.read_sql_query(
-            "SELECT descricao, debito, credito, valor, data_movimento, data_processamento FROM classificacoes WHERE empresa_id=? ORDER BY data_movimento DESC",
+            "SELECT descricao, debito, credito, valor_centavos, data_movimento, data_processamento FROM classificacoes WHERE empresa_id=? ORDER BY data_movimento DESC",
             conn,
             params=(empresa_id,),
         )
     except Exception:
         # Se algo falhar, retorna DataFrame vazio
-        df = pd.DataFrame(columns=["descricao", "debito", "credito", "valor", "data_movimento", "data_processamento"])
+        df = pd.DataFrame(columns=["descricao", "debito", "credito", "valor_centavos", "data_movimento", "data_processamento"])
     conn.close()
+    # o banco guarda centavos inteiros; reais só para exibição
+    df.insert(3, "valor", df.pop("valor_centavos") / 100)
     return df
 
+def totais_por_mes(empresa_id):
+    """Quantidade e soma exata (em centavos) dos lançamentos por ano/mês, calculadas no SQLite."""
+    conn = conectar()
+    rows = conn.execute(
+        """
+        SELECT CAST(strftime('%Y', data_movimento) AS INTEGER), CAST(strftime('%m', data_movimento) AS INTEGER),
+               COUNT(*), SUM(valor_centavos)
+        FROM classificacoes WHERE empresa_id=?
+        GROUP BY 1, 2
+        """,
+        (empresa_id,)
+    ).fetchall()
+    conn.close()
+    return {(ano, mes): (qtd, total) for ano, mes, qtd, total in rows}
 
-# ==========================================================
-# UTILITÁRIAS: detectar colunas e normalizar dados
-# ==========================================================
-def find_column(columns, candidates):
-    cols_lower = [c.lower() for c in columns]
-    for cand in candidates:
-        for i, c in enumerate(cols_lower):
-            if cand in c:
-                return columns[i]  # retorna nome original
-    return None
-
-def parse_number(value):
-    """Tenta converter vários formatos numéricos (BR e EN)."""
-    if pd.isna(value):
-        return 0.0
-    if isinstance(value, (int, float)):
-        return float(value)
-    s = str(value).strip()
-    if s == "":
-        return 0.0
-    # remove currency symbols and spaces
-    s = s.replace("R$", "").replace("$", "").strip()
-    # if contains both '.' and ',', likely BR format like '1.234,56'
-    if "." in s and "," in s:
-        s = s.replace(".", "").replace(",", ".")
-    else:
-        # if only comma, treat as decimal separator
-        if "," in s and "." not in s:
-            s = s.replace(",", ".")
-        # if only dots, keep as is (thousands maybe missing)
-    try:
-        return float(s)
-    except:
-        # fallback: try removing non-digits
-        import re
-        s2 = re.sub(r"[^\d\.\\-]", "", s)
-        try:
-            return float(s2)
-        except:
-            return 0.0
-
-def parse_date(value):
-    """Tenta converter vários formatos de data para pd.Timestamp ou None."""
-    if pd.isna(value):
-        return None
-    try:
-        # tenta conversão direta (aceita várias formas)
-        dt = pd.to_datetime(value, dayfirst=True, errors="coerce")
-        return dt
-    except:
-        return None
+def formatar_centavos(centavos):
+    """Formata centavos inteiros como 'R$ 1.234,56', sem passar por float."""
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(centavos), 100)
+    return f"{sinal}R$ {reais:,}".replace(",", ".") + f",{resto:02d}"
 
 
 # ==========================================================
@@ -204,22 +134,29 @@ st.markdown(f"📊 **Classificando lançamentos da empresa:** `{empresa_nome}`")
 # ==========================================================
 st.subheader("📚 Classificações registradas")
 
-df_class = listar_classificacoes(empresa_id)
-if df_class.empty:
+df_class = listar_classificacoes(empresa_id) if existem_classificacoes(empresa_id) else None
+if df_class is None or df_class.empty:
     st.info("Nenhuma classificação registrada ainda para esta empresa.")
 else:
-    # Agrupa por ano/mês
+    import pandas as pd
+
+    # Agrupa por ano/mês; os totais vêm somados em centavos pelo próprio SQLite
+    totais = totais_por_mes(empresa_id)
     df_class["data_movimento"] = pd.to_datetime(df_class["data_movimento"], errors="coerce")
     df_class["Ano"] = df_class["data_movimento"].dt.year
-    df_class["Mês"] = df_class["data_movimento"].dt.strftime("%B")
+    df_class["Mês"] = df_class["data_movimento"].dt.month
 
     for ano in sorted(df_class["Ano"].dropna().unique(), reverse=True):
-        with st.expander(f"📅 {int(ano)}"):
-            df_ano = df_class[df_class["Ano"] == ano]
+        df_ano = df_class[df_class["Ano"] == ano]
+        total_ano = sum(t for (a, _), (_, t) in totais.items() if a == ano)
+        with st.expander(f"📅 {int(ano)} — {formatar_centavos(total_ano)}"):
             for mes in sorted(df_ano["Mês"].dropna().unique()):
-                with st.expander(f"🗓️ {mes} ({len(df_ano[df_ano['Mês']==mes])} lançamentos)"):
+                df_mes = df_ano[df_ano["Mês"] == mes]
+                qtd, total = totais.get((int(ano), int(mes)), (len(df_mes), 0))
+                nome_mes = df_mes["data_movimento"].iloc[0].strftime("%B")
+                with st.expander(f"🗓️ {nome_mes} ({qtd} lançamentos, {formatar_centavos(total)})"):
                     st.dataframe(
-                        df_ano[df_ano["Mês"] == mes][
+                        df_mes[
                             ["data_movimento", "descricao", "debito", "credito", "valor"]
                         ].sort_values("data_movimento"),
                         use_container_width=True
@@ -227,31 +164,25 @@ else:
 
 
 # ==========================================================
-# UPLOAD DO EXTRATO
+# UPLOAD DOS EXTRATOS
 # ==========================================================
 st.divider()
-st.subheader("📥 Importar novo extrato")
+st.subheader("📥 Importar novos extratos")
 
-arquivo_extrato = st.file_uploader("Anexe o extrato (CSV ou XLSX)", type=["csv", "xlsx"])
+arquivos_extrato = st.file_uploader(
+    "Anexe um ou mais extratos (CSV, XLSX ou OFX)", type=["csv", "xlsx", "ofx"], accept_multiple_files=True
+)
 
-def read_table(uploaded_file):
-    if uploaded_file is None:
-        return None
-    name = uploaded_file.name.lower()
-    try:
-        if name.endswith(".csv"):
-            return pd.read_csv(uploaded_file)
-        elif name.endswith(".xlsx") or name.endswith(".xls"):
-            return pd.read_excel(uploaded_file)
-    except Exception as e:
-        st.error(f"Erro ao ler o arquivo: {e}")
-        return None
+if arquivos_extrato:
+    st.caption(f"{len(arquivos_extrato)} arquivo(s) selecionado(s)")
+    if len(arquivos_extrato) == 1:
+        from classificador import read_table
 
-df_extrato = read_table(arquivo_extrato)
-
-if df_extrato is not None:
-    st.subheader("📄 Pré-visualização do extrato")
-    st.dataframe(df_extrato.head(15))
+        try:
+            st.subheader("📄 Pré-visualização do extrato")
+            st.dataframe(read_table(arquivos_extrato[0]).head(15))
+        except Exception as e:
+            st.error(f"Erro ao ler o arquivo: {e}")
 
 
 # ==========================================================
@@ -260,10 +191,20 @@ if df_extrato is not None:
 # Usamos session_state para manter o resultado da última classificação
 if "last_classified_df" not in st.session_state:
     st.session_state["last_classified_df"] = None
+if "last_resumo" not in st.session_state:
+    st.session_state["last_resumo"] = None
+
+with st.expander("🔎 Sugestões por similaridade"):
+    st.caption(
+        "Lançamentos sem correspondência exata recebem a referência mais parecida "
+        "e uma pontuação de similaridade (0 a 1)."
+    )
+    limiar_sugestao = st.slider("Similaridade mínima", 0.0, 1.0, LIMIAR_SUGESTAO, 0.05)
+    aplicar_sugestoes = st.checkbox("Aplicar automaticamente as sugestões acima do limite")
 
 if st.button("⚙️ Executar classificação"):
-    if df_extrato is None:
-        st.error("Envie um extrato antes de executar a classificação.")
+    if not arquivos_extrato:
+        st.error("Envie ao menos um extrato antes de executar a classificação.")
         st.stop()
 
     refs = listar_referencias(empresa_id)
@@ -271,77 +212,43 @@ if st.button("⚙️ Executar classificação"):
         st.error("Nenhuma referência encontrada para esta empresa.")
         st.stop()
 
-    df = df_extrato.copy()
-
-    # Detecta colunas
-    desc_col = find_column(df.columns, ["descr", "description", "hist", "histórico", "historico"])
-    date_col = find_column(df.columns, ["data", "date", "dt"])
-    val_col  = find_column(df.columns, ["valor", "value", "amount", "amt", "vlr"])
-
-    if desc_col is None:
-        # fallback para segunda coluna
-        if len(df.columns) >= 2:
-            desc_col = df.columns[1]
-            st.warning(f"Não encontrei coluna de descrição. Usando: {desc_col}")
-        else:
-            st.error("Não foi possível identificar a coluna de descrição no extrato.")
-            st.stop()
+    import pandas as pd
+    from classificador import processar_arquivos
 
-    # Normaliza colunas para salvar facilmente
-    df["descricao_norm"] = df[desc_col].astype(str)
-
-    # normaliza valor
-    if val_col is not None:
-        df["valor_norm"] = df[val_col].apply(parse_number)
-    else:
-        # tenta colunas comuns ou cria zeros
-        df["valor_norm"] = 0.0
+    # Leitura, detecção de colunas e correspondência em paralelo, um arquivo por tarefa
+    arquivos = [(f.name, f.getvalue()) for f in arquivos_extrato]
+    with st.spinner(f"Processando {len(arquivos)} arquivo(s)..."):
+        df_to_save, resumos = processar_arquivos(
+            arquivos, refs, limiar=limiar_sugestao, aplicar_sugestoes=aplicar_sugestoes
+        )
 
-    # normaliza data
-    if date_col is not None:
-        df["data_norm"] = df[date_col].apply(parse_date)
+    st.session_state["last_resumo"] = pd.DataFrame(resumos)
+    if df_to_save is None:
+        st.error("Nenhum lançamento pôde ser lido dos arquivos enviados.")
+        st.session_state["last_classified_df"] = None
     else:
-        # tenta detectar colunas com formato data mesmo se nome não óbvio
-        possible_date = None
-        for c in df.columns:
-            parsed = pd.to_datetime(df[c], errors="coerce", dayfirst=True)
-            if parsed.notna().sum() > 0:
-                possible_date = c
-                break
-        if possible_date:
-            df["data_norm"] = pd.to_datetime(df[possible_date], errors="coerce", dayfirst=True)
-        else:
-            df["data_norm"] = pd.NaT
-
-    # Prepara colunas de saída
-    df["Débito"] = ""
-    df["Crédito"] = ""
-
-    # Executa correspondência
-    for i, row in df.iterrows():
-        desc = str(row["descricao_norm"]).lower()
-        matched = False
-        for nome, conta_d, conta_e in refs:
-            if nome is None:
-                continue
-            if nome.lower() in desc:
-                df.at[i, "Débito"] = conta_d
-                df.at[i, "Crédito"] = conta_e
-                matched = True
-                break
-
-    st.success("Classificação concluída ✅")
-    st.dataframe(df.head(15))
-
-    # preenche o session_state com versão normalizada para salvar
-    df_to_save = pd.DataFrame({
-        "descricao": df["descricao_norm"],
-        "debito": df["Débito"],
-        "credito": df["Crédito"],
-        "valor": df["valor_norm"],
-        "data_movimento": df["data_norm"]
-    })
-    st.session_state["last_classified_df"] = df_to_save
+        st.success("Classificação concluída ✅")
+        st.dataframe(df_to_save.head(15))
+        st.session_state["last_classified_df"] = df_to_save
+
+# Resumo por arquivo da última classificação
+if st.session_state.get("last_resumo") is not None:
+    st.subheader("🧾 Resumo por arquivo")
+    st.dataframe(
+        st.session_state["last_resumo"],
+        column_config={
+            "arquivo": "Arquivo",
+            "linhas": "Linhas",
+            "classificadas": "Classificadas",
+            "sem_classificacao": "Sem classificação",
+            "sugeridas": "Sugestões acima do limite",
+            "tempo_s": "Tempo (s)",
+            "avisos": "Avisos",
+            "erro": "Erro",
+        },
+        use_container_width=True,
+        hide_index=True,
+    )
 
 # Botão para salvar - agora usa session_state
 if st.session_state.get("last_classified_df") is not None:
@@ -351,12 +258,15 @@ if st.session_state.get("last_classified_df") is not None:
             st.success("Lançamentos salvos com sucesso no banco!")
             # limpa o último resultado salvo
             st.session_state["last_classified_df"] = None
+            st.session_state["last_resumo"] = None
             st.rerun()
         except Exception as e:
             st.error(f"Erro ao salvar no banco: {e}")
 
 # Download do último resultado (se houver)
 if st.session_state.get("last_classified_df") is not None:
+    import pandas as pd
+
     towrite = io.BytesIO()
     tmp = st.session_state["last_classified_df"].copy()
     # formata data_movimento como string para Excel
@@ -1,6 +1,7 @@
 import streamlit as st
-import sqlite3
 from datetime import datetime
+from banco import conectar, inicializar_banco
+import expurgo
 
 # =========================================
 # Página: Empresas
@@ -13,18 +14,8 @@ st.caption("Gerencie as empresas cadastradas no Vledger")
 # =========================================
 # Funções auxiliares de banco de dados
 # =========================================
-def conectar():
-    conn = sqlite3.connect("vledger.db")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS empresas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome_empresa TEXT NOT NULL,
-            cnpj TEXT,
-            responsavel TEXT,
-            data_cadastro TEXT
-        )
-    """)
-    return conn
+# Garante as tabelas (uma vez por processo)
+inicializar_banco()
 
 def inserir_empresa(nome, cnpj, responsavel):
     conn = conectar()
@@ -48,16 +39,15 @@ def atualizar_empresa(emp_id, nome, cnpj, responsavel):
     conn.close()
 
 def excluir_empresa(emp_id):
-    conn = conectar()
-    conn.execute("DELETE FROM empresas WHERE id=?", (emp_id,))
-    conn.commit()
-    conn.close()
+    # Remove a empresa e agenda o expurgo em lotes de referências e classificações
+    expurgo.excluir_empresa_com_expurgo(emp_id)
+
 
 # =========================================
 # Layout principal
 # =========================================
 
-tab1, tab2, tab3 = st.tabs(["➕ Adicionar", "📋 Empresas Cadastradas", "⚙️ Editar / Excluir"])
+tab1, tab2, tab3, tab4 = st.tabs(["➕ Adicionar", "📋 Empresas Cadastradas", "⚙️ Editar / Excluir", "🧹 Exclusões"])
 
 # ----------------------------
 # Aba 1 - Adicionar
@@ -128,5 +118,24 @@ with tab3:
         with col2:
             if st.button("🗑️ Excluir empresa"):
                 excluir_empresa(emp[0])
-                st.warning(f"Empresa '{emp[1]}' excluída.")
-                st.experimental_rerun()
\ No newline at end of file
+                st.warning(f"Empresa '{emp[1]}' excluída. Os dados vinculados serão removidos em segundo plano.")
+                st.experimental_rerun()
+
+# ----------------------------
+# Aba 4 - Progresso dos expurgos
+# ----------------------------
+with tab4:
+    st.subheader("Remoção de dados de empresas excluídas")
+
+    expurgos = expurgo.listar_expurgos()
+    if len(expurgos) == 0:
+        st.info("Nenhuma exclusão registrada.")
+    else:
+        for empresa_id, total, removidos, status, data_inicio, data_fim in expurgos:
+            if status == "concluido":
+                st.caption(f"✅ Empresa ID {empresa_id}: {removidos} registros removidos ({data_fim})")
+            else:
+                fracao = removidos / total if total else 0.0
+                st.progress(min(fracao, 1.0), text=f"Empresa ID {empresa_id}: {removidos}/{total} registros removidos")
+        if st.button("🔄 Atualizar progresso"):
+            st.rerun()
\ No newline at end of file
@@ -1,104 +1,9 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
 from datetime import datetime
+from banco import conectar, inicializar_banco
+import reclassificacao
 
-# =========================================
-# Funções utilitárias e banco de dados
-# =========================================
-def conectar():
-    return sqlite3.connect("vledger.db")
-
-def ensure_tables_and_columns():
-    conn = conectar()
-    cur = conn.cursor()
-
-    # 1) garante que a tabela empresas exista
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS empresas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome_empresa TEXT NOT NULL,
-            cnpj TEXT,
-            responsavel TEXT,
-            data_cadastro TEXT
-        )
-    """)
-
-    # 2) cria a tabela referencias se não existir (com todas as colunas corretas)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS referencias (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER NOT NULL,
-            nome TEXT NOT NULL,
-            conta_d TEXT,
-            conta_e TEXT,
-            data_cadastro TEXT,
-            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
-        )
-    """)
-
-    # 3) garantir que a coluna data_cadastro exista
-    cur.execute("PRAGMA table_info(referencias)")
-    cols = [row[1] for row in cur.fetchall()]
-    if "data_cadastro" not in cols:
-        try:
-            cur.execute("ALTER TABLE referencias ADD COLUMN data_cadastro TEXT")
-            conn.commit()
-            print("Added column data_cadastro to referencias")
-        except Exception as e:
-            print("Could not add column data_cadastro:", e)
-
-    conn.close()
-
-
-def ensure_empresa_id_column():
-    """Garante que a coluna empresa_id exista na tabela referencias"""
-    conn = conectar()
-    cur = conn.cursor()
-
-    cur.execute("PRAGMA table_info(referencias)")
-    cols = [row[1] for row in cur.fetchall()]
-
-    if "empresa_id" not in cols:
-        st.warning("⚙️ Atualizando estrutura da tabela 'referencias'...")
-
-        # Renomeia a tabela antiga
-        cur.execute("ALTER TABLE referencias RENAME TO referencias_old")
-
-        # Cria a nova tabela com a estrutura correta
-        cur.execute("""
-            CREATE TABLE referencias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empresa_id INTEGER NOT NULL,
-                nome TEXT NOT NULL,
-                conta_d TEXT,
-                conta_e TEXT,
-                data_cadastro TEXT,
-                FOREIGN KEY (empresa_id) REFERENCES empresas (id)
-            )
-        """)
-
-        # Copia os dados antigos
-        try:
-            cur.execute("""
-                INSERT INTO referencias (id, nome, conta_d, conta_e, data_cadastro)
-                SELECT id, nome, conta_d, conta_e, data_cadastro FROM referencias_old
-            """)
-        except Exception as e:
-            st.error(f"Erro ao migrar dados antigos: {e}")
-
-        # Remove a tabela antiga
-        cur.execute("DROP TABLE referencias_old")
-        conn.commit()
-        st.success("✅ Estrutura da tabela 'referencias' atualizada com sucesso!")
-
-    conn.close()
-
-
-# Executa verificações ao abrir a página
-ensure_tables_and_columns()
-ensure_empresa_id_column()
-
+# pandas (via leitura.py) é importado apenas no trecho que lê arquivos de referência
 
 # =========================================
 # Página: Referências (Plano Contábil)
@@ -108,6 +13,9 @@ st.set_page_config(page_title="Plano Contábil | Vledger", page_icon="📘", lay
 st.title("📘 Plano Contábil")
 st.caption("Gerencie as referências contábeis de cada empresa")
 
+# Garante as tabelas (uma vez por processo)
+inicializar_banco()
+
 
 # =========================================
 # Funções CRUD
@@ -201,11 +109,10 @@ with st.expander("➕ Adicionar nova referência"):
 with st.expander("📥 Importar referências de arquivo (CSV ou XLSX)"):
     uploaded_file = st.file_uploader("Selecione um arquivo de referência", type=["csv", "xlsx"])
     if uploaded_file:
+        from leitura import ler_extrato
         try:
-            if uploaded_file.name.endswith(".csv"):
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
+            # separador e codificação detectados; contas (ex.: '2.1') permanecem como texto
+            df = ler_extrato(uploaded_file.name, uploaded_file.getvalue(), tipar=False)
             st.dataframe(df)
             if st.button("Importar referências do arquivo"):
                 importar_referencias_csv(empresa_id, df)
@@ -219,8 +126,17 @@ with st.expander("📋 Referências cadastradas"):
     if len(refs) == 0:
         st.info("Nenhuma referência cadastrada para esta empresa.")
     else:
-        df_refs = pd.DataFrame(refs, columns=["ID", "Nome", "Conta Débito", "Conta Crédito", "Data Cadastro"])
-        st.dataframe(df_refs, use_container_width=True)
+        st.dataframe(
+            refs,
+            column_config={
+                0: "ID",
+                1: "Nome",
+                2: "Conta Débito",
+                3: "Conta Crédito",
+                4: "Data Cadastro",
+            },
+            use_container_width=True,
+        )
 
 with st.expander("⚙️ Editar ou excluir referência"):
     refs = listar_referencias(empresa_id)
@@ -245,4 +161,24 @@ with st.expander("⚙️ Editar ou excluir referência"):
             if st.button("🗑️ Excluir referência"):
                 excluir_referencia(ref[0])
                 st.warning(f"Referência '{ref[1]}' excluída.")
-                st.experimental_rerun()
\ No newline at end of file
+                st.experimental_rerun()
+
+with st.expander("🔄 Reclassificar lançamentos gravados"):
+    # só as regras alteradas desde a última reclassificação são reaplicadas
+    pendencias = reclassificacao.contar_pendencias(empresa_id)
+    if pendencias == 0:
+        st.info("Os lançamentos gravados já refletem o plano contábil atual.")
+    else:
+        st.write(f"**{pendencias}** regra(s) adicionada(s), alterada(s) ou removida(s) desde a última reclassificação.")
+        if st.button("🔄 Reclassificar agora"):
+            barra = st.progress(0.0, text="Reclassificando...")
+
+            def progresso(processados, total):
+                barra.progress(processados / total if total else 1.0, text=f"{processados:,} de {total:,} lançamentos")
+
+            resultado = reclassificacao.reclassificar(empresa_id, progresso=progresso)
+            barra.progress(1.0, text="Concluído")
+            st.success(
+                f"{resultado['atualizados']:,} de {resultado['candidatos']:,} lançamentos afetados atualizados "
+                f"em {resultado['tempo_s']}s."
+            )
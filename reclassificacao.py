@@ -0,0 +1,182 @@
+import time
+
+from banco import conectar, inicializar_banco
+
+# classificador (pandas, pyarrow) só é importado em `reclassificar`: a página do
+# plano contábil chama `contar_pendencias` a cada renderização
+
+# =========================================
+# Reclassificação incremental dos lançamentos gravados
+# =========================================
+# Triggers em `referencias` registram em `referencias_alteracoes` cada versão
+# (nome e contas) das regras incluídas, alteradas ou excluídas desde a última
+# reclassificação, inclusive as intermediárias: uma regra alterada e depois
+# desfeita, ou incluída e depois excluída, pode ter classificado lançamentos
+# gravados nesse meio tempo. O resultado de um lançamento só muda se a
+# descrição contém o nome de alguma dessas versões, então apenas esses
+# lançamentos são buscados (pelo índice FTS5 trigram de `classificacoes_fts`),
+# reclassificados com o plano atual e atualizados em lotes, cada um em uma
+# transação curta. No fim, o registro processado é apagado.
+#
+# Sugestões por similaridade aplicadas automaticamente (similaridade.py) não
+# contêm o nome da regra na descrição; esses lançamentos guardam o nome da
+# regra em `referencia_sugerida` e também são selecionados por ela. Se a regra
+# foi alterada, recebem as novas contas; se foi removida, ficam sem conta.
+#
+# Em bancos criados antes do registro, todas as regras começam pendentes, o que
+# equivale a uma passada completa.
+
+TAMANHO_LOTE = 5000
+MIN_TRIGRAMA = 3  # nomes menores que isso não podem ser buscados no índice trigram
+
+
+def _referencias_atuais(conn, empresa_id):
+    rows = conn.execute(
+        "SELECT id, nome, conta_d, conta_e FROM referencias WHERE empresa_id=? ORDER BY nome",
+        (empresa_id,)
+    ).fetchall()
+    return {r[0]: (r[1], r[2], r[3]) for r in rows}, [(r[1], r[2], r[3]) for r in rows]
+
+def alteracoes(conn, empresa_id):
+    """
+    Versões registradas das regras alteradas desde a última reclassificação:
+    lista de (ref_id, nome, conta_d, conta_e) e o último id do registro lido.
+    """
+    rows = conn.execute(
+        "SELECT id, ref_id, nome, conta_d, conta_e FROM referencias_alteracoes WHERE empresa_id=? ORDER BY id",
+        (empresa_id,)
+    ).fetchall()
+    ultimo_id = rows[-1][0] if rows else 0
+    return [r[1:] for r in rows], ultimo_id
+
+def contar_pendencias(empresa_id):
+    """Número de regras incluídas, alteradas ou excluídas desde a última reclassificação."""
+    inicializar_banco()
+    conn = conectar()
+    total = conn.execute(
+        "SELECT COUNT(DISTINCT ref_id) FROM referencias_alteracoes WHERE empresa_id=?", (empresa_id,)
+    ).fetchone()[0]
+    conn.close()
+    return total
+
+
+def _fts_disponivel(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name='classificacoes_fts'").fetchone() is not None
+
+def _ids_candidatos(conn, empresa_id, nomes, sugeridas=()):
+    """
+    IDs dos lançamentos da empresa cuja descrição contém algum dos nomes, mais
+    os que receberam por sugestão as contas de uma das regras em `sugeridas`.
+    """
+    fts = _fts_disponivel(conn)
+    ids = set()
+    if sugeridas:
+        marcadores = ",".join("?" * len(sugeridas))
+        rows = conn.execute(
+            f"SELECT id FROM classificacoes WHERE empresa_id=? AND referencia_sugerida IN ({marcadores})",
+            (empresa_id, *sugeridas),
+        )
+        ids.update(r[0] for r in rows)
+    curtos = []
+    for nome in nomes:
+        if fts and len(nome) >= MIN_TRIGRAMA:
+            consulta = '"' + nome.replace('"', '""') + '"'
+            rows = conn.execute(
+                # subconsulta: com JOIN o planejador percorre a empresa e reavalia o MATCH por linha
+                """
+                SELECT id FROM classificacoes
+                WHERE id IN (SELECT rowid FROM classificacoes_fts WHERE classificacoes_fts MATCH ?)
+                  AND empresa_id = ?
+                """,
+                (consulta, empresa_id),
+            )
+            ids.update(r[0] for r in rows)
+        else:
+            curtos.append(nome)
+
+    # nomes curtos (ou SQLite sem FTS5): uma única varredura dos lançamentos da empresa
+    if curtos:
+        rows = conn.execute("SELECT id, descricao FROM classificacoes WHERE empresa_id=?", (empresa_id,))
+        for id_, descricao in rows:
+            desc = str(descricao).lower()
+            if any(n in desc for n in curtos):
+                ids.add(id_)
+    return sorted(ids)
+
+
+def reclassificar(empresa_id, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """
+    Reaplica o plano de referências atual aos lançamentos afetados pelas regras
+    alteradas desde a última execução. `progresso(processados, total)` é chamado
+    após cada lote, se informado. Retorna um dicionário com as contagens.
+    """
+    from classificador import classificar_descricao, preparar_referencias
+
+    inicio = time.perf_counter()
+    inicializar_banco()
+    conn = conectar()
+    try:
+        versoes, ultimo_id = alteracoes(conn, empresa_id)
+        atuais, refs_ordenadas = _referencias_atuais(conn, empresa_id)
+        refs = preparar_referencias(refs_ordenadas)
+
+        nomes = {str(n).lower() for _, n, _, _ in versoes if n and str(n).strip()}
+        # nome de cada versão -> regra atual (None se excluída), para as sugestões aplicadas
+        sugeridas = {n: atuais.get(ref_id) for ref_id, n, _, _ in versoes if n}
+        antigas = list({(str(n).lower(), d or "", e or "") for _, n, d, e in versoes if n})
+
+        ids = _ids_candidatos(conn, empresa_id, nomes, list(sugeridas)) if nomes else []
+        atualizados = 0
+        for i in range(0, len(ids), tamanho_lote):
+            bloco = ids[i:i + tamanho_lote]
+            marcadores = ",".join("?" * len(bloco))
+            rows = conn.execute(
+                f"SELECT id, descricao, debito, credito, referencia_sugerida FROM classificacoes WHERE id IN ({marcadores})",
+                bloco,
+            ).fetchall()
+
+            mudancas = []
+            for id_, descricao, debito, credito, sugerida in rows:
+                atual = (debito or "", credito or "")
+                novo = classificar_descricao(descricao, refs)
+                novo = (novo[0] or "", novo[1] or "")
+                nova_sugerida = None
+                if novo == ("", "") and sugerida is not None:
+                    # contas vindas de sugestão: acompanham a regra sugerida
+                    if sugerida not in sugeridas:
+                        continue
+                    regra = sugeridas[sugerida]
+                    if regra is not None:
+                        novo, nova_sugerida = (regra[1] or "", regra[2] or ""), regra[0]
+                elif novo == ("", ""):
+                    # sem regra atual: só limpa se as contas vieram de alguma versão registrada
+                    desc = str(descricao).lower()
+                    if not any(n in desc and atual == (d, e) for n, d, e in antigas):
+                        continue
+                if novo != atual or nova_sugerida != sugerida:
+                    mudancas.append((novo[0], novo[1], nova_sugerida, id_))
+
+            if mudancas:
+                with conn:
+                    conn.executemany(
+                        "UPDATE classificacoes SET debito=?, credito=?, referencia_sugerida=? WHERE id=?", mudancas
+                    )
+                atualizados += len(mudancas)
+            if progresso is not None:
+                progresso(min(i + tamanho_lote, len(ids)), len(ids))
+
+        # limpa o registro só no fim: se o processo cair, a próxima execução refaz tudo.
+        # Alterações feitas durante a execução têm id maior e ficam para a próxima.
+        with conn:
+            conn.execute(
+                "DELETE FROM referencias_alteracoes WHERE empresa_id=? AND id <= ?", (empresa_id, ultimo_id)
+            )
+    finally:
+        conn.close()
+
+    return {
+        "regras": len({ref_id for ref_id, _, _, _ in versoes}),
+        "candidatos": len(ids),
+        "atualizados": atualizados,
+        "tempo_s": round(time.perf_counter() - inicio, 3),
+    }
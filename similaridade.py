@@ -0,0 +1,138 @@
+import re
+import unicodedata
+
+# ==========================================================
+# Sugestões por similaridade para lançamentos sem correspondência exata
+# ==========================================================
+# As referências são indexadas uma única vez como uma matriz esparsa de
+# n-gramas de caracteres (n-grama x referência). Cada bloco de descrições
+# vira outra matriz esparsa e a similaridade de todas as descrições contra
+# todas as referências sai de um único produto de matrizes, sem laço
+# descrição x referência em Python.
+#
+# A pontuação é a fração dos n-gramas da referência presentes na descrição
+# (1.0 = todos os trechos da palavra-chave aparecem), o que tolera acentos,
+# abreviações e pequenos erros de digitação.
+
+TAMANHO_NGRAMA = 3
+LIMIAR_SUGESTAO = 0.75
+TAMANHO_BLOCO = 2048  # descrições por produto de matrizes; limita a memória
+
+# numpy/scipy são importados dentro das funções: as páginas leem
+# LIMIAR_SUGESTAO ao abrir e não devem pagar o custo dessas bibliotecas
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sem acentos e só com letras/dígitos separados por um espaço."""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " " + re.sub(r"[^a-z0-9]+", " ", texto).strip() + " "
+
+def ngramas(texto, n=TAMANHO_NGRAMA):
+    t = normalizar_texto(texto)
+    if len(t) <= n:
+        return {t}
+    return {t[i:i + n] for i in range(len(t) - n + 1)}
+
+
+def construir_indice(refs):
+    """
+    Indexa as referências `(nome, conta_d, conta_e)`. Retorna um dicionário com
+    o vocabulário de n-gramas, a matriz esparsa n-grama x referência já dividida
+    pelo número de n-gramas de cada referência, e as referências indexadas.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    vocab = {}
+    linhas, colunas = [], []
+    validas = []
+    for nome, conta_d, conta_e in refs:
+        if nome is None or not str(nome).strip():
+            continue
+        j = len(validas)
+        validas.append((nome, conta_d, conta_e))
+        for g in ngramas(nome):
+            linhas.append(vocab.setdefault(g, len(vocab)))
+            colunas.append(j)
+
+    dados = np.ones(len(linhas), dtype=np.float32)
+    matriz = sparse.csr_matrix((dados, (linhas, colunas)), shape=(len(vocab), len(validas)))
+    tamanhos = np.asarray(matriz.sum(axis=0)).ravel()
+    tamanhos[tamanhos == 0] = 1
+    matriz = (matriz @ sparse.diags(1.0 / tamanhos)).tocsr().astype(np.float32)
+    return {"vocab": vocab, "matriz": matriz, "refs": validas}
+
+def _matriz_consulta(textos, vocab):
+    import numpy as np
+    from scipy import sparse
+
+    indptr = [0]
+    indices = []
+    for t in textos:
+        indices.extend(vocab[g] for g in ngramas(t) if g in vocab)
+        indptr.append(len(indices))
+    dados = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((dados, indices, indptr), shape=(len(textos), len(vocab)))
+
+def sugerir(textos, indice, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Para cada texto, devolve a posição da referência mais parecida em
+    `indice["refs"]` (-1 se nenhuma compartilha n-gramas) e a pontuação (0 a 1).
+    Em empate vale a primeira referência, como na correspondência exata.
+    """
+    import numpy as np
+
+    textos = list(textos)
+    posicoes = np.full(len(textos), -1, dtype=np.int64)
+    pontuacoes = np.zeros(len(textos), dtype=np.float32)
+    if not textos or not indice["refs"]:
+        return posicoes, pontuacoes
+
+    for inicio in range(0, len(textos), tamanho_bloco):
+        fim = inicio + tamanho_bloco
+        consulta = _matriz_consulta(textos[inicio:fim], indice["vocab"])
+        similaridade = (consulta @ indice["matriz"]).tocsr()
+        melhores = np.asarray(similaridade.argmax(axis=1)).ravel()
+        valores = similaridade.max(axis=1).toarray().ravel()
+        encontrados = valores > 0
+        posicoes[inicio:fim] = np.where(encontrados, melhores, -1)
+        pontuacoes[inicio:fim] = valores
+    return posicoes, pontuacoes
+
+
+def completar_com_sugestoes(df, indice, limiar=LIMIAR_SUGESTAO, aplicar=False):
+    """
+    Adiciona `sugestao` e `similaridade` às linhas sem débito/crédito. Com
+    `aplicar=True`, preenche as contas das sugestões com pontuação >= `limiar`
+    e marca essas linhas em `sugestao_aplicada` (a reclassificação usa isso
+    para achar lançamentos cuja descrição não contém o nome da regra).
+    Retorna o DataFrame e o número de sugestões acima do limiar.
+    """
+    import numpy as np
+
+    df = df.copy()
+    df["sugestao"] = ""
+    df["similaridade"] = 0.0
+    df["sugestao_aplicada"] = False
+
+    pendentes = (df["debito"].fillna("") == "") & (df["credito"].fillna("") == "")
+    if not pendentes.any() or not indice["refs"]:
+        return df, 0
+
+    idx = df.index[pendentes.to_numpy()]
+    posicoes, pontuacoes = sugerir(df.loc[idx, "descricao"].astype(str), indice)
+    com_sugestao = posicoes >= 0
+
+    nomes = np.array([r[0] for r in indice["refs"]], dtype=object)
+    df.loc[idx[com_sugestao], "sugestao"] = nomes[posicoes[com_sugestao]]
+    df.loc[idx, "similaridade"] = np.round(pontuacoes, 3)
+
+    acima = com_sugestao & (pontuacoes >= limiar)
+    if aplicar and acima.any():
+        contas_d = np.array([r[1] for r in indice["refs"]], dtype=object)
+        contas_e = np.array([r[2] for r in indice["refs"]], dtype=object)
+        df.loc[idx[acima], "debito"] = contas_d[posicoes[acima]]
+        df.loc[idx[acima], "credito"] = contas_e[posicoes[acima]]
+        df.loc[idx[acima], "sugestao_aplicada"] = True
+    return df, int(acima.sum())
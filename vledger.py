@@ -1,6 +1,5 @@
 import streamlit as st
-import sqlite3
-from datetime import datetime
+from banco import inicializar_banco
 
 # =========================================
 # Página principal do sistema
@@ -13,52 +12,8 @@ st.caption("Inteligência para seus lançamentos contábeis")
 st.markdown("---")
 
 # =========================================
-# Inicializa o banco de dados (garante as tabelas)
+# Inicializa o banco de dados (garante as tabelas, uma vez por processo)
 # =========================================
-def inicializar_banco():
-    conn = sqlite3.connect("vledger.db")
-    cursor = conn.cursor()
-
-    # Tabela de empresas
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS empresas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome_empresa TEXT NOT NULL,
-            cnpj TEXT,
-            responsavel TEXT,
-            data_cadastro TEXT
-        )
-    """)
-
-    # Tabela de referências (plano contábil)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS referencias (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER NOT NULL,
-            nome TEXT NOT NULL,
-            conta_d TEXT,
-            conta_e TEXT,
-            data_cadastro TEXT,
-            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
-        )
-    """)
-
-    # Tabela de classificações (lançamentos)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS classificacoes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            empresa_id INTEGER NOT NULL,
-            descricao TEXT,
-            debito TEXT,
-            credito TEXT,
-            valor REAL,
-            data_processamento TEXT,
-            FOREIGN KEY (empresa_id) REFERENCES empresas (id)
-        )
-    """)
-    conn.commit()
-    conn.close()
-
 inicializar_banco()
 
 st.success("Banco de dados inicializado com sucesso ✅")